@@ -2,6 +2,10 @@ import logging
 import typing
 
 from fastapi import Request
+from itsdangerous import BadSignature
+from itsdangerous import URLSafeTimedSerializer
+
+from dlmengine.cache import TTLCache
 
 from dlmengine.crud.users import CrudUsers
 from dlmengine.crud.credentials import CrudCredentials
@@ -23,11 +27,29 @@ class Authorize:
         crud_permissions: CrudPermissions,
         crud_users: CrudUsers,
         crud_users_credentials: CrudCredentials,
+        permission_cache: TTLCache,
+        user_cache: TTLCache,
+        secret_key: str,
+        token_ttl: int,
     ):
         self._crud_permission = crud_permissions
         self._crud_users = crud_users
         self._crud_users_credentials = crud_users_credentials
         self._log = log
+        self._permission_cache = permission_cache
+        self._token_serializer = URLSafeTimedSerializer(
+            secret_key=secret_key, salt="dlmengine.token"
+        )
+        self._token_ttl = token_ttl
+        self._user_cache = user_cache
+
+    @property
+    def caches(self) -> dict[str, TTLCache]:
+        return {
+            "credentials": self.crud_users_credentials.cache,
+            "permissions": self.permission_cache,
+            "users": self.user_cache,
+        }
 
     @property
     def crud_permission(self) -> CrudPermissions:
@@ -38,21 +60,45 @@ class Authorize:
         return self._crud_users
 
     @property
-    def crud_users_credentials(self):
+    def crud_users_credentials(self) -> CrudCredentials:
         return self._crud_users_credentials
 
     @property
     def log(self):
         return self._log
 
+    @property
+    def permission_cache(self) -> TTLCache:
+        return self._permission_cache
+
+    @property
+    def token_ttl(self) -> int:
+        return self._token_ttl
+
+    @property
+    def user_cache(self) -> TTLCache:
+        return self._user_cache
+
+    async def create_token(self, user: ModelV2UserGet) -> str:
+        permissions = await self.crud_permission.permissions_of_user(user=user.id)
+        return self._token_serializer.dumps(
+            {"user": user.id, "admin": user.admin, "permissions": permissions}
+        )
+
     async def get_user(self, request: Request) -> ModelV2UserGet:
+        user = self.get_user_from_token(request=request)
+        if user:
+            return user
         user = self.get_user_from_session(request=request)
         if not user:
             user = await self.get_user_from_credentials(request=request)
         if not user:
             raise SessionCredentialError
-        user = await self.crud_users.get(_id=user, fields=["id", "admin"])
-        return user
+        result = self.user_cache.get(user)
+        if result is None:
+            result = await self.crud_users.get(_id=user, fields=["id", "admin"])
+            self.user_cache.set(user, result)
+        return result
 
     async def get_user_from_credentials(
         self, request: Request
@@ -66,6 +112,20 @@ class Authorize:
             self.log.debug("trying to get user from credentials, failed")
             return None
 
+    def get_user_from_token(self, request: Request) -> ModelV2UserGet | None:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        self.log.debug("trying to get user from token")
+        try:
+            data = self._token_serializer.loads(token, max_age=self.token_ttl)
+        except BadSignature:
+            self.log.debug("trying to get user from token, failed")
+            raise CredentialError
+        # the token carries everything require_permission needs, no lookups
+        request.state.token_permissions = data["permissions"]
+        return ModelV2UserGet(id=data["user"], admin=data["admin"])
+
     def get_user_from_session(self, request: Request) -> typing.Optional[str]:
         self.log.debug("trying to get user from session")
         user = request.session.get("username", None)
@@ -76,6 +136,18 @@ class Authorize:
             self.log.debug(f"received user {user} from session")
             return user
 
+    def invalidate(self, user_id: typing.Optional[str] = None) -> None:
+        if user_id is None:
+            self.crud_users_credentials.invalidate()
+            self.user_cache.clear()
+            self.permission_cache.clear()
+            return
+        self.user_cache.pop(user_id)
+        self.permission_cache.invalidate(lambda key: key[0] == user_id)
+
+    def invalidate_permissions(self) -> None:
+        self.permission_cache.clear()
+
     async def require_admin(self, request, user=None) -> ModelV2UserGet:
         if not user:
             user = await self.get_user(request=request)
@@ -96,15 +168,16 @@ class Authorize:
             return await self.require_admin(request=request, user=user)
         except AdminError:
             pass
-        permissions = await self.crud_permission.search(
-            users=f"^{user.id}$",
-            permissions=f"^{permission}$",
-            sort="id",
-            sort_order="ascending",
-            page=0,
-            limit=1,
-            fields=["id"],
-        )
-        if not permissions.result:
+        token_permissions = getattr(request.state, "token_permissions", None)
+        if token_permissions is not None:
+            granted = permission in token_permissions
+        else:
+            granted = self.permission_cache.get((user.id, permission))
+        if granted is None:
+            granted = await self.crud_permission.has_permission(
+                user=user.id, permission=permission
+            )
+            self.permission_cache.set((user.id, permission), granted)
+        if not granted:
             raise PermError(permission=permission)
         return user
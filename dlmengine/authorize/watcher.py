@@ -0,0 +1,62 @@
+import asyncio
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+import pymongo.errors
+
+from dlmengine.authorize import Authorize
+
+
+class AuthorizeWatcher:
+    def __init__(
+        self,
+        log: logging.Logger,
+        authorize: Authorize,
+        colls: list[AsyncIOMotorCollection],
+        retry_interval: int,
+    ):
+        self._authorize = authorize
+        self._colls = colls
+        self._log = log
+        self._retry_interval = retry_interval
+
+    @property
+    def authorize(self):
+        return self._authorize
+
+    @property
+    def colls(self):
+        return self._colls
+
+    @property
+    def log(self):
+        return self._log
+
+    @property
+    def retry_interval(self):
+        return self._retry_interval
+
+    async def run(self) -> None:
+        await asyncio.gather(*(self._watch(coll=coll) for coll in self.colls))
+
+    async def _watch(self, coll: AsyncIOMotorCollection) -> None:
+        # writes of other instances only show up here, local writes already
+        # invalidated the caches, without change streams the cache ttl applies.
+        self.log.info(f"watching {coll.name} for authorization changes")
+        resume_token = None
+        while True:
+            try:
+                async with coll.watch(resume_after=resume_token) as stream:
+                    async for _ in stream:
+                        resume_token = stream.resume_token
+                        self.authorize.invalidate()
+            except pymongo.errors.OperationFailure as err:
+                self.log.warning(
+                    f"change streams on {coll.name} not available, "
+                    f"authorization caches rely on their ttl: {err}"
+                )
+                return
+            except pymongo.errors.ConnectionFailure as err:
+                self.log.error(f"lost change stream on {coll.name}: {err}")
+                self.authorize.invalidate()
+                await asyncio.sleep(self.retry_interval)
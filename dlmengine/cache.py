@@ -0,0 +1,63 @@
+import collections
+import time
+import typing
+
+
+class TTLCache:
+    def __init__(self, ttl: float, size: int):
+        self._data: collections.OrderedDict = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._size = size
+        self._ttl = ttl
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def get(self, key: typing.Hashable, default=None):
+        try:
+            expires, value = self._data[key]
+        except KeyError:
+            self._misses += 1
+            return default
+        if expires <= time.monotonic():
+            del self._data[key]
+            self._misses += 1
+            return default
+        self._data.move_to_end(key)
+        self._hits += 1
+        return value
+
+    def invalidate(self, match: typing.Callable[[typing.Hashable], bool]) -> None:
+        for key in [key for key in self._data if match(key)]:
+            del self._data[key]
+
+    def pop(self, key: typing.Hashable) -> None:
+        self._data.pop(key, None)
+
+    def set(self, key: typing.Hashable, value) -> None:
+        if self.size <= 0 or self.ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.size:
+            self._data.popitem(last=False)
@@ -13,16 +13,38 @@ class ConfigApp(BaseModel):
     host: str = "127.0.0.1"
     port: int = 8000
     secretkey: str = "secret"
+    tokenttl: int = 300
+
+
+class ConfigCache(BaseModel):
+    size: int = 10000
+    ttl: int = 10
+
+
+class ConfigHashing(BaseModel):
+    workers: int = 4
 
 
 class ConfigLdap(BaseModel):
     url: typing.Optional[str] = None
     basedn: typing.Optional[str] = None
     binddn: typing.Optional[str] = None
+    cachesize: int = 10000
+    cachettl: int = 300
+    memberbatch: int = 500
     password: typing.Optional[str] = None
+    syncconcurrency: int = 4
+    syncinterval: int = 300
     userpattern: typing.Optional[str] = None
 
 
+class ConfigLocks(BaseModel):
+    eventqueue: int = 1000
+    pollinterval: int = 1
+    preimages: bool = False
+    reaperinterval: int = 1
+
+
 class ConfigMongodb(BaseModel):
     url: str = "mongodb://localhost:27017"
     database: str = "dlmengine"
@@ -49,7 +71,10 @@ class ConfigOAuth(BaseModel):
 
 class Config(BaseSettings):
     app: ConfigApp = ConfigApp()
+    cache: ConfigCache = ConfigCache()
+    hashing: ConfigHashing = ConfigHashing()
     ldap: ConfigLdap = ConfigLdap()
+    locks: ConfigLocks = ConfigLocks()
     mongodb: ConfigMongodb = ConfigMongodb()
     oauth: typing.Optional[dict[str, ConfigOAuth]] = None
     model_config = SettingsConfigDict(env_file=".env", env_nested_delimiter="_")
@@ -1,4 +1,5 @@
 import logging
+import typing
 
 import httpx
 from fastapi import APIRouter
@@ -13,8 +14,11 @@ from dlmengine.crud.ldap import CrudLdap
 from dlmengine.crud.locks import CrudLocks
 from dlmengine.crud.oauth import CrudOAuth
 from dlmengine.crud.permissions import CrudPermissions
+from dlmengine.crud.semaphores import CrudSemaphores
 from dlmengine.crud.users import CrudUsers
 
+from dlmengine.sync import LdapSync
+
 
 class Controller:
     def __init__(
@@ -25,9 +29,11 @@ class Controller:
         crud_locks: CrudLocks,
         crud_oauth: dict[str, CrudOAuth],
         crud_permissions: CrudPermissions,
+        crud_semaphores: CrudSemaphores,
         crud_users: CrudUsers,
         crud_users_credentials: CrudCredentials,
         http: httpx.AsyncClient,
+        ldap_sync: typing.Optional[LdapSync],
     ):
         self._log = log
         self._router = APIRouter()
@@ -39,9 +45,11 @@ class Controller:
                 crud_ldap=crud_ldap,
                 crud_locks=crud_locks,
                 crud_permissions=crud_permissions,
+                crud_semaphores=crud_semaphores,
                 crud_users=crud_users,
                 crud_users_credentials=crud_users_credentials,
                 http=http,
+                ldap_sync=ldap_sync,
             ).router,
             prefix="/api",
             responses={404: {"description": "Not found"}},
@@ -1,4 +1,5 @@
 import logging
+import typing
 
 import httpx
 from fastapi import APIRouter
@@ -12,8 +13,11 @@ from dlmengine.crud.credentials import CrudCredentials
 from dlmengine.crud.ldap import CrudLdap
 from dlmengine.crud.locks import CrudLocks
 from dlmengine.crud.permissions import CrudPermissions
+from dlmengine.crud.semaphores import CrudSemaphores
 from dlmengine.crud.users import CrudUsers
 
+from dlmengine.sync import LdapSync
+
 
 class ControllerApi:
     def __init__(
@@ -23,9 +27,11 @@ class ControllerApi:
         crud_ldap: CrudLdap,
         crud_locks: CrudLocks,
         crud_permissions: CrudPermissions,
+        crud_semaphores: CrudSemaphores,
         crud_users: CrudUsers,
         crud_users_credentials: CrudCredentials,
         http: httpx.AsyncClient,
+        ldap_sync: typing.Optional[LdapSync],
     ):
         self._router = APIRouter()
         self._log = log
@@ -37,9 +43,11 @@ class ControllerApi:
                 crud_ldap=crud_ldap,
                 crud_locks=crud_locks,
                 crud_permissions=crud_permissions,
+                crud_semaphores=crud_semaphores,
                 crud_users=crud_users,
                 crud_users_credentials=crud_users_credentials,
                 http=http,
+                ldap_sync=ldap_sync,
             ).router,
             prefix="/v2",
             responses={404: {"description": "Not found"}},
@@ -86,8 +86,7 @@ class ControllerApiV1Locks:
         await self.authorize.require_permission(
             request=request, permission="LOCK:DELETE"
         )
-        await self.crud_locks.delete_mark(_id=lock_id)
-        return await self.crud_locks.delete(_id=lock_id)
+        return await self.crud_locks.release(_id=lock_id)
 
     async def get(
         self,
@@ -1,4 +1,5 @@
 import logging
+import typing
 
 import httpx
 from fastapi import APIRouter
@@ -7,7 +8,9 @@ from dlmengine.authorize import Authorize
 
 from dlmengine.controller.api.v2.authenticate import ControllerApiV2Authenticate
 from dlmengine.controller.api.v2.locks import ControllerApiV2Locks
+from dlmengine.controller.api.v2.metrics import ControllerApiV2Metrics
 from dlmengine.controller.api.v2.permissions import ControllerApiV2Permissions
+from dlmengine.controller.api.v2.semaphores import ControllerApiV2Semaphores
 from dlmengine.controller.api.v2.users import ControllerApiV2Users
 from dlmengine.controller.api.v2.users_credentials import (
     ControllerApiV2UsersCredentials,
@@ -17,8 +20,11 @@ from dlmengine.crud.credentials import CrudCredentials
 from dlmengine.crud.ldap import CrudLdap
 from dlmengine.crud.locks import CrudLocks
 from dlmengine.crud.permissions import CrudPermissions
+from dlmengine.crud.semaphores import CrudSemaphores
 from dlmengine.crud.users import CrudUsers
 
+from dlmengine.sync import LdapSync
+
 
 class ControllerApiV2:
     def __init__(
@@ -28,9 +34,11 @@ class ControllerApiV2:
         crud_ldap: CrudLdap,
         crud_locks: CrudLocks,
         crud_permissions: CrudPermissions,
+        crud_semaphores: CrudSemaphores,
         crud_users: CrudUsers,
         crud_users_credentials: CrudCredentials,
         http: httpx.AsyncClient,
+        ldap_sync: typing.Optional[LdapSync],
     ):
         self._router = APIRouter()
         self._log = log
@@ -54,6 +62,16 @@ class ControllerApiV2:
             responses={404: {"description": "Not found"}},
         )
 
+        self.router.include_router(
+            ControllerApiV2Metrics(
+                log=log,
+                authorize=authorize,
+                crud_users=crud_users,
+                ldap_sync=ldap_sync,
+            ).router,
+            responses={404: {"description": "Not found"}},
+        )
+
         self.router.include_router(
             ControllerApiV2Permissions(
                 log=log,
@@ -64,6 +82,15 @@ class ControllerApiV2:
             responses={404: {"description": "Not found"}},
         )
 
+        self.router.include_router(
+            ControllerApiV2Semaphores(
+                log=log,
+                authorize=authorize,
+                crud_semaphores=crud_semaphores,
+            ).router,
+            responses={404: {"description": "Not found"}},
+        )
+
         self.router.include_router(
             ControllerApiV2Users(
                 log=log,
@@ -14,6 +14,7 @@ from dlmengine.errors import AuthenticationError
 from dlmengine.model.v2.common import ModelV2DataDelete
 from dlmengine.model.v2.authenticate import ModelV2AuthenticateGetUser
 from dlmengine.model.v2.authenticate import ModelV2AuthenticatePost
+from dlmengine.model.v2.authenticate import ModelV2AuthenticateToken
 
 
 class ControllerApiV2Authenticate:
@@ -46,6 +47,13 @@ class ControllerApiV2Authenticate:
         self.router.add_api_route(
             "", self.delete, response_model=ModelV2DataDelete, methods=["DELETE"]
         )
+        self.router.add_api_route(
+            "/token",
+            self.create_token,
+            response_model=ModelV2AuthenticateToken,
+            methods=["POST"],
+            status_code=201,
+        )
 
     @property
     def authorize(self):
@@ -82,6 +90,17 @@ class ControllerApiV2Authenticate:
         request.session["username"] = user
         return {"user": user}
 
+    async def create_token(self, request: Request):
+        user = await self.authorize.get_user(request=request)
+        if getattr(request.state, "token_permissions", None) is not None:
+            # a token is not refreshed from itself, that would keep revoked
+            # permissions alive forever
+            user = await self.crud_users.get(_id=user.id, fields=["id", "admin"])
+        token = await self.authorize.create_token(user=user)
+        return ModelV2AuthenticateToken(
+            token=token, expires_in=self.authorize.token_ttl
+        )
+
     @staticmethod
     async def delete(request: Request):
         request.session.clear()
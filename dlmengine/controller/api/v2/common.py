@@ -0,0 +1,12 @@
+import typing
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+
+def ndjson_response(items: typing.AsyncIterator[BaseModel]) -> StreamingResponse:
+    async def lines():
+        async for item in items:
+            yield item.model_dump_json(exclude_unset=True) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
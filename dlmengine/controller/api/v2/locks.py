@@ -1,22 +1,33 @@
+import asyncio
 import logging
 from typing import Set
 
 from fastapi import APIRouter
 from fastapi import Query
 from fastapi import Request
+from fastapi import Response
+from fastapi.responses import StreamingResponse
 
 from dlmengine.authorize import Authorize
 
+from dlmengine.controller.api.v2.common import ndjson_response
+
 from dlmengine.crud.locks import CrudLocks
 
 from dlmengine.model.v2.common import ModelV2DataDelete
+from dlmengine.model.v2.common import format_literal
 from dlmengine.model.v2.common import sort_order_literal
 from dlmengine.model.v2.locks import filter_list
 from dlmengine.model.v2.locks import filter_literal
 from dlmengine.model.v2.locks import sort_literal
+from dlmengine.model.v2.locks import ModelV2LockBatchDelete
+from dlmengine.model.v2.locks import ModelV2LockBatchPost
 from dlmengine.model.v2.locks import ModelV2LockGet
 from dlmengine.model.v2.locks import ModelV2LockGetMulti
 from dlmengine.model.v2.locks import ModelV2LockPost
+from dlmengine.model.v2.locks import ModelV2LockRenewPut
+from dlmengine.model.v2.locks import ModelV2LockRenewMultiPut
+from dlmengine.model.v2.locks import ModelV2LockTransferPut
 
 
 class ControllerApiV2Locks:
@@ -42,6 +53,34 @@ class ControllerApiV2Locks:
             response_model_exclude_unset=True,
             methods=["GET"],
         )
+        self.router.add_api_route(
+            "/_batch",
+            self.create_batch,
+            response_model=ModelV2LockGetMulti,
+            response_model_exclude_unset=True,
+            methods=["POST"],
+            status_code=201,
+        )
+        self.router.add_api_route(
+            "/_batch",
+            self.delete_batch,
+            response_model=ModelV2DataDelete,
+            response_model_exclude_unset=True,
+            methods=["DELETE"],
+        )
+        self.router.add_api_route(
+            "/_events",
+            self.events,
+            response_class=StreamingResponse,
+            methods=["GET"],
+        )
+        self.router.add_api_route(
+            "/_renew",
+            self.renew_multi,
+            response_model=ModelV2LockGetMulti,
+            response_model_exclude_unset=True,
+            methods=["PUT"],
+        )
         self.router.add_api_route(
             "/{lock_id}",
             self.create,
@@ -64,6 +103,20 @@ class ControllerApiV2Locks:
             response_model_exclude_unset=True,
             methods=["GET"],
         )
+        self.router.add_api_route(
+            "/{lock_id}/renew",
+            self.renew,
+            response_model=ModelV2LockGet,
+            response_model_exclude_unset=True,
+            methods=["PUT"],
+        )
+        self.router.add_api_route(
+            "/{lock_id}/transfer",
+            self.transfer,
+            response_model=ModelV2LockGet,
+            response_model_exclude_unset=True,
+            methods=["PUT"],
+        )
 
     @property
     def authorize(self):
@@ -86,20 +139,106 @@ class ControllerApiV2Locks:
         data: ModelV2LockPost,
         lock_id: str,
         request: Request,
+        response: Response,
         fields: Set[filter_literal] = Query(default=filter_list),
+        wait: int = Query(
+            default=0,
+            ge=0,
+            le=300,
+            description="seconds to wait for a held lock to be released, max value 300",
+        ),
     ):
         await self.authorize.require_permission(request=request, permission="LOCK:POST")
 
-        return await self.crud_locks.create(
-            _id=lock_id, payload=data, fields=list(fields)
+        result = await self.crud_locks.create(
+            _id=lock_id, payload=data, fields=list(fields), wait=wait
         )
+        # shared locks do not count holds, joining one again is a no-op
+        if data.reentrant and (result.hold_count or 0) > 1:
+            response.status_code = 200
+        return result
+
+    async def create_batch(
+        self,
+        data: ModelV2LockBatchPost,
+        request: Request,
+        fields: Set[filter_literal] = Query(default=filter_list),
+    ):
+        await self.authorize.require_permission(request=request, permission="LOCK:POST")
+        return await self.crud_locks.create_batch(payload=data, fields=list(fields))
 
-    async def delete(self, request: Request, lock_id: str):
+    async def delete(
+        self,
+        request: Request,
+        lock_id: str,
+        acquired_by: str = Query(
+            description="only release if held by this holder, releases its share "
+            "of a shared lock, or one hold of a reentrant lock",
+            default=None,
+        ),
+        if_holder: str = Query(
+            description="only release the whole lock if held exclusive by this "
+            "holder, including all holds of a reentrant lock",
+            default=None,
+        ),
+    ):
         await self.authorize.require_permission(
             request=request, permission="LOCK:DELETE"
         )
-        await self.crud_locks.delete_mark(_id=lock_id)
-        return await self.crud_locks.delete(_id=lock_id)
+        if if_holder is not None:
+            return await self.crud_locks.release(
+                _id=lock_id, acquired_by=if_holder, exclusive=True
+            )
+        if acquired_by is not None:
+            if await self.crud_locks.delete_shared(
+                _id=lock_id, acquired_by=acquired_by
+            ):
+                return ModelV2DataDelete()
+            if await self.crud_locks.delete_reentrant(
+                _id=lock_id, acquired_by=acquired_by
+            ):
+                return ModelV2DataDelete()
+            # acquired_by of a shared lock may name a holder that already left
+            return await self.crud_locks.release(
+                _id=lock_id, acquired_by=acquired_by, exclusive=True
+            )
+        return await self.crud_locks.release(_id=lock_id)
+
+    async def delete_batch(self, data: ModelV2LockBatchDelete, request: Request):
+        await self.authorize.require_permission(
+            request=request, permission="LOCK:DELETE"
+        )
+        return await self.crud_locks.delete_batch(payload=data)
+
+    async def events(
+        self,
+        request: Request,
+        lock_id_prefix: str = Query(
+            description="filter: only stream events of lock ids with this prefix",
+            default="",
+        ),
+    ):
+        user = await self.authorize.require_user(request=request)
+        queue = self.crud_locks.lock_events.subscribe(prefix=lock_id_prefix)
+        return StreamingResponse(
+            self._events(queue=queue),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    async def _events(self, queue: asyncio.Queue):
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield f"event: {event.event}\ndata: {event.model_dump_json(exclude_none=True)}\n\n"
+        finally:
+            self.crud_locks.lock_events.unsubscribe(queue=queue)
 
     async def get(
         self,
@@ -110,10 +249,35 @@ class ControllerApiV2Locks:
         user = await self.authorize.require_user(request=request)
         return await self.crud_locks.get(_id=lock_id, fields=list(fields))
 
+    async def renew(
+        self,
+        data: ModelV2LockRenewPut,
+        lock_id: str,
+        request: Request,
+        fields: Set[filter_literal] = Query(default=filter_list),
+    ):
+        await self.authorize.require_permission(request=request, permission="LOCK:POST")
+        return await self.crud_locks.renew(
+            _id=lock_id, payload=data, fields=list(fields)
+        )
+
+    async def renew_multi(
+        self,
+        data: ModelV2LockRenewMultiPut,
+        request: Request,
+        fields: Set[filter_literal] = Query(default=filter_list),
+    ):
+        await self.authorize.require_permission(request=request, permission="LOCK:POST")
+        return await self.crud_locks.renew_multi(payload=data, fields=list(fields))
+
     async def search(
         self,
         request: Request,
         lock_id: str = Query(description="filter: regular_expressions", default=None),
+        lock_id_prefix: str = Query(description="filter: lock id prefix", default=None),
+        lock_id_in: str = Query(
+            description="filter: comma separated list of lock ids", default=None
+        ),
         fields: Set[filter_literal] = Query(default=filter_list),
         sort: sort_literal = Query(default="id"),
         sort_order: sort_order_literal = Query(default="ascending"),
@@ -124,14 +288,53 @@ class ControllerApiV2Locks:
             le=1000,
             description="pagination limit, min value 10, max value 1000",
         ),
+        after: str = Query(
+            description="pagination cursor, meta.next_cursor of the previous page",
+            default=None,
+        ),
+        with_count: bool = Query(
+            description="include the total result_size in meta", default=True
+        ),
+        format: format_literal = Query(
+            description="ndjson streams all matches, one per line, "
+            "ignoring page, limit and after",
+            default="json",
+        ),
     ):
         user = await self.authorize.require_user(request=request)
 
+        if format == "ndjson":
+            return ndjson_response(
+                self.crud_locks.search_stream(
+                    _id=lock_id,
+                    _id_prefix=lock_id_prefix,
+                    _id_in=lock_id_in,
+                    fields=list(fields),
+                    sort=sort,
+                    sort_order=sort_order,
+                )
+            )
         return await self.crud_locks.search(
             _id=lock_id,
+            _id_prefix=lock_id_prefix,
+            _id_in=lock_id_in,
             fields=list(fields),
             sort=sort,
             sort_order=sort_order,
             page=page,
             limit=limit,
+            after=after,
+            with_count=with_count,
+        )
+
+    async def transfer(
+        self,
+        data: ModelV2LockTransferPut,
+        lock_id: str,
+        request: Request,
+        fields: Set[filter_literal] = Query(default=filter_list),
+    ):
+        await self.authorize.require_permission(request=request, permission="LOCK:POST")
+        return await self.crud_locks.transfer(
+            _id=lock_id, payload=data, fields=list(fields)
         )
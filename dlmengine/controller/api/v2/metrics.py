@@ -0,0 +1,97 @@
+import logging
+import typing
+
+from fastapi import APIRouter
+from fastapi import Request
+
+from dlmengine.authorize import Authorize
+
+from dlmengine.crud.users import CrudUsers
+
+from dlmengine.model.v2.metrics import ModelV2MetricsCache
+from dlmengine.model.v2.metrics import ModelV2MetricsGet
+from dlmengine.model.v2.metrics import ModelV2MetricsHashing
+from dlmengine.model.v2.metrics import ModelV2MetricsLdapSync
+
+from dlmengine.sync import LdapSync
+
+
+class ControllerApiV2Metrics:
+
+    def __init__(
+        self,
+        log: logging.Logger,
+        authorize: Authorize,
+        crud_users: CrudUsers,
+        ldap_sync: typing.Optional[LdapSync],
+    ):
+        self._authorize = authorize
+        self._crud_users = crud_users
+        self._ldap_sync = ldap_sync
+        self._log = log
+        self._router = APIRouter(
+            prefix="/metrics",
+            tags=["metrics"],
+        )
+
+        self.router.add_api_route(
+            "",
+            self.get,
+            response_model=ModelV2MetricsGet,
+            methods=["GET"],
+        )
+
+    @property
+    def authorize(self):
+        return self._authorize
+
+    @property
+    def caches(self):
+        return {**self.authorize.caches, "ldap": self.crud_users.crud_ldap.cache}
+
+    @property
+    def crud_users(self):
+        return self._crud_users
+
+    @property
+    def ldap_sync(self):
+        return self._ldap_sync
+
+    @property
+    def log(self):
+        return self._log
+
+    @property
+    def router(self):
+        return self._router
+
+    async def get(self, request: Request):
+        await self.authorize.require_admin(request=request)
+        caches = {}
+        for name, cache in self.caches.items():
+            lookups = cache.hits + cache.misses
+            caches[name] = ModelV2MetricsCache(
+                entries=len(cache),
+                hit_ratio=cache.hits / lookups if lookups else None,
+                hits=cache.hits,
+                misses=cache.misses,
+            )
+        hasher = self.crud_users.hasher
+        result = ModelV2MetricsGet(
+            caches=caches,
+            hashing=ModelV2MetricsHashing(
+                running=hasher.running,
+                waiting=hasher.waiting,
+                workers=hasher.workers,
+            ),
+        )
+        if self.ldap_sync:
+            result.ldap_sync = ModelV2MetricsLdapSync(
+                errors=self.ldap_sync.errors,
+                last_duration=self.ldap_sync.last_duration,
+                last_errors=self.ldap_sync.last_errors,
+                last_run=self.ldap_sync.last_run,
+                last_updated=self.ldap_sync.last_updated,
+                runs=self.ldap_sync.runs,
+            )
+        return result
@@ -7,10 +7,13 @@ from fastapi import Request
 
 from dlmengine.authorize import Authorize
 
+from dlmengine.controller.api.v2.common import ndjson_response
+
 from dlmengine.crud.permissions import CrudPermissions
 from dlmengine.crud.ldap import CrudLdap
 
 from dlmengine.model.v2.common import ModelV2DataDelete
+from dlmengine.model.v2.common import format_literal
 from dlmengine.model.v2.common import sort_order_literal
 from dlmengine.model.v2.permissions import filter_list
 from dlmengine.model.v2.permissions import filter_literal
@@ -104,14 +107,17 @@ class ControllerApiV2Permissions:
     ):
         await self.authorize.require_admin(request=request)
         if data.ldap_group:
+            self.crud_ldap.invalidate(group=data.ldap_group)
             data.users = await self.crud_ldap.get_logins_from_group(
                 group=data.ldap_group
             )
-        return await self.crud_permissions.create(
+        result = await self.crud_permissions.create(
             _id=permission_id,
             payload=data,
             fields=list(fields),
         )
+        self.authorize.invalidate_permissions()
+        return result
 
     async def delete(
         self,
@@ -122,9 +128,11 @@ class ControllerApiV2Permissions:
         await self.crud_permissions.delete_mark(
             _id=permission_id,
         )
-        return await self.crud_permissions.delete(
+        result = await self.crud_permissions.delete(
             _id=permission_id,
         )
+        self.authorize.invalidate_permissions()
+        return result
 
     async def get(
         self,
@@ -155,8 +163,31 @@ class ControllerApiV2Permissions:
             le=1000,
             description="pagination limit, min value 10, max value 1000",
         ),
+        after: str = Query(
+            description="pagination cursor, meta.next_cursor of the previous page",
+            default=None,
+        ),
+        with_count: bool = Query(
+            description="include the total result_size in meta", default=True
+        ),
+        format: format_literal = Query(
+            description="ndjson streams all matches, one per line, "
+            "ignoring page, limit and after",
+            default="json",
+        ),
     ):
         await self.authorize.require_admin(request=request)
+        if format == "ndjson":
+            return ndjson_response(
+                self.crud_permissions.search_stream(
+                    _id=permission_id,
+                    ldap_group=ldap_group,
+                    users=users,
+                    fields=list(fields),
+                    sort=sort,
+                    sort_order=sort_order,
+                )
+            )
         return await self.crud_permissions.search(
             _id=permission_id,
             ldap_group=ldap_group,
@@ -166,6 +197,8 @@ class ControllerApiV2Permissions:
             sort_order=sort_order,
             page=page,
             limit=limit,
+            after=after,
+            with_count=with_count,
         )
 
     async def update(
@@ -181,15 +214,19 @@ class ControllerApiV2Permissions:
             fields=["ldap_group", "users"],
         )
         if data.ldap_group:
+            self.crud_ldap.invalidate(group=data.ldap_group)
             data.users = await self.crud_ldap.get_logins_from_group(
                 group=data.ldap_group
             )
         elif current_group.ldap_group:
+            self.crud_ldap.invalidate(group=current_group.ldap_group)
             data.users = await self.crud_ldap.get_logins_from_group(
                 group=current_group.ldap_group
             )
-        return await self.crud_permissions.update(
+        result = await self.crud_permissions.update(
             _id=permission_id,
             payload=data,
             fields=list(fields),
         )
+        self.authorize.invalidate_permissions()
+        return result
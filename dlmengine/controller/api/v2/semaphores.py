@@ -0,0 +1,206 @@
+import logging
+from typing import Set
+
+from fastapi import APIRouter
+from fastapi import Query
+from fastapi import Request
+
+from dlmengine.authorize import Authorize
+
+from dlmengine.crud.semaphores import CrudSemaphores
+
+from dlmengine.model.v2.common import ModelV2DataDelete
+from dlmengine.model.v2.common import sort_order_literal
+from dlmengine.model.v2.semaphores import filter_list
+from dlmengine.model.v2.semaphores import filter_literal
+from dlmengine.model.v2.semaphores import sort_literal
+from dlmengine.model.v2.semaphores import ModelV2SemaphoreGet
+from dlmengine.model.v2.semaphores import ModelV2SemaphoreGetMulti
+from dlmengine.model.v2.semaphores import ModelV2SemaphoreHolderPost
+from dlmengine.model.v2.semaphores import ModelV2SemaphorePost
+from dlmengine.model.v2.semaphores import ModelV2SemaphorePut
+
+
+class ControllerApiV2Semaphores:
+
+    def __init__(
+        self,
+        log: logging.Logger,
+        authorize: Authorize,
+        crud_semaphores: CrudSemaphores,
+    ):
+        self._authorize = authorize
+        self._crud_semaphores = crud_semaphores
+        self._log = log
+        self._router = APIRouter(
+            prefix="/semaphores",
+            tags=["semaphores"],
+        )
+
+        self.router.add_api_route(
+            "",
+            self.search,
+            response_model=ModelV2SemaphoreGetMulti,
+            response_model_exclude_unset=True,
+            methods=["GET"],
+        )
+        self.router.add_api_route(
+            "/{semaphore_id}",
+            self.create,
+            response_model=ModelV2SemaphoreGet,
+            response_model_exclude_unset=True,
+            methods=["POST"],
+            status_code=201,
+        )
+        self.router.add_api_route(
+            "/{semaphore_id}",
+            self.delete,
+            response_model=ModelV2DataDelete,
+            response_model_exclude_unset=True,
+            methods=["DELETE"],
+        )
+        self.router.add_api_route(
+            "/{semaphore_id}",
+            self.get,
+            response_model=ModelV2SemaphoreGet,
+            response_model_exclude_unset=True,
+            methods=["GET"],
+        )
+        self.router.add_api_route(
+            "/{semaphore_id}",
+            self.update,
+            response_model=ModelV2SemaphoreGet,
+            response_model_exclude_unset=True,
+            methods=["PUT"],
+        )
+        self.router.add_api_route(
+            "/{semaphore_id}/holders",
+            self.acquire,
+            response_model=ModelV2SemaphoreGet,
+            response_model_exclude_unset=True,
+            methods=["POST"],
+            status_code=201,
+        )
+        self.router.add_api_route(
+            "/{semaphore_id}/holders/{acquired_by}",
+            self.release,
+            response_model=ModelV2SemaphoreGet,
+            response_model_exclude_unset=True,
+            methods=["DELETE"],
+        )
+
+    @property
+    def authorize(self):
+        return self._authorize
+
+    @property
+    def crud_semaphores(self):
+        return self._crud_semaphores
+
+    @property
+    def log(self):
+        return self._log
+
+    @property
+    def router(self):
+        return self._router
+
+    async def acquire(
+        self,
+        data: ModelV2SemaphoreHolderPost,
+        semaphore_id: str,
+        request: Request,
+        fields: Set[filter_literal] = Query(default=filter_list),
+    ):
+        await self.authorize.require_permission(request=request, permission="LOCK:POST")
+        return await self.crud_semaphores.acquire(
+            _id=semaphore_id, payload=data, fields=list(fields)
+        )
+
+    async def create(
+        self,
+        data: ModelV2SemaphorePost,
+        semaphore_id: str,
+        request: Request,
+        fields: Set[filter_literal] = Query(default=filter_list),
+    ):
+        await self.authorize.require_admin(request=request)
+        return await self.crud_semaphores.create(
+            _id=semaphore_id, payload=data, fields=list(fields)
+        )
+
+    async def delete(self, request: Request, semaphore_id: str):
+        await self.authorize.require_admin(request=request)
+        await self.crud_semaphores.delete_mark(_id=semaphore_id)
+        return await self.crud_semaphores.delete(_id=semaphore_id)
+
+    async def get(
+        self,
+        semaphore_id: str,
+        request: Request,
+        fields: Set[filter_literal] = Query(default=filter_list),
+    ):
+        await self.authorize.require_user(request=request)
+        return await self.crud_semaphores.get(_id=semaphore_id, fields=list(fields))
+
+    async def release(
+        self,
+        semaphore_id: str,
+        acquired_by: str,
+        request: Request,
+        fields: Set[filter_literal] = Query(default=filter_list),
+    ):
+        await self.authorize.require_permission(
+            request=request, permission="LOCK:DELETE"
+        )
+        return await self.crud_semaphores.release(
+            _id=semaphore_id, acquired_by=acquired_by, fields=list(fields)
+        )
+
+    async def search(
+        self,
+        request: Request,
+        semaphore_id: str = Query(
+            description="filter: regular_expressions", default=None
+        ),
+        fields: Set[filter_literal] = Query(default=filter_list),
+        sort: sort_literal = Query(default="id"),
+        sort_order: sort_order_literal = Query(default="ascending"),
+        page: int = Query(default=0, ge=0, description="pagination index"),
+        limit: int = Query(
+            default=10,
+            ge=10,
+            le=1000,
+            description="pagination limit, min value 10, max value 1000",
+        ),
+        after: str = Query(
+            description="pagination cursor, meta.next_cursor of the previous page",
+            default=None,
+        ),
+        with_count: bool = Query(
+            description="include the total result_size in meta", default=True
+        ),
+    ):
+        await self.authorize.require_user(request=request)
+        return await self.crud_semaphores.search(
+            _id=semaphore_id,
+            fields=list(fields),
+            sort=sort,
+            sort_order=sort_order,
+            page=page,
+            limit=limit,
+            after=after,
+            with_count=with_count,
+        )
+
+    async def update(
+        self,
+        data: ModelV2SemaphorePut,
+        semaphore_id: str,
+        request: Request,
+        fields: Set[filter_literal] = Query(default=filter_list),
+    ):
+        await self.authorize.require_admin(request=request)
+        return await self.crud_semaphores.update(
+            _id=semaphore_id, payload=data, fields=list(fields)
+        )
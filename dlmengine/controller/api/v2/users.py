@@ -7,11 +7,14 @@ from fastapi import Request
 
 from dlmengine.authorize import Authorize
 
+from dlmengine.controller.api.v2.common import ndjson_response
+
 from dlmengine.crud.permissions import CrudPermissions
 from dlmengine.crud.users import CrudUsers
 from dlmengine.crud.credentials import CrudCredentials
 
 from dlmengine.model.v2.common import ModelV2DataDelete
+from dlmengine.model.v2.common import format_literal
 from dlmengine.model.v2.common import sort_order_literal
 from dlmengine.model.v2.users import filter_list
 from dlmengine.model.v2.users import filter_literal
@@ -119,7 +122,9 @@ class ControllerApiV2Users:
         await self.crud_users.delete_mark(_id=user_id)
         await self.curd_users_credentials.delete_all_from_owner(owner=user_id)
         await self.crud_permissions.delete_user_from_permissions(user_id=user_id)
-        return await self.crud_users.delete(_id=user_id)
+        result = await self.crud_users.delete(_id=user_id)
+        self.authorize.invalidate(user_id=user_id)
+        return result
 
     async def get(
         self,
@@ -148,8 +153,29 @@ class ControllerApiV2Users:
             le=1000,
             description="pagination limit, min value 10, max value 1000",
         ),
+        after: str = Query(
+            description="pagination cursor, meta.next_cursor of the previous page",
+            default=None,
+        ),
+        with_count: bool = Query(
+            description="include the total result_size in meta", default=True
+        ),
+        format: format_literal = Query(
+            description="ndjson streams all matches, one per line, "
+            "ignoring page, limit and after",
+            default="json",
+        ),
     ):
         await self.authorize.require_admin(request=request)
+        if format == "ndjson":
+            return ndjson_response(
+                self.crud_users.search_stream(
+                    _id=user_id,
+                    fields=list(fields),
+                    sort=sort,
+                    sort_order=sort_order,
+                )
+            )
         return await self.crud_users.search(
             _id=user_id,
             fields=list(fields),
@@ -157,6 +183,8 @@ class ControllerApiV2Users:
             sort_order=sort_order,
             page=page,
             limit=limit,
+            after=after,
+            with_count=with_count,
         )
 
     async def update(
@@ -172,6 +200,8 @@ class ControllerApiV2Users:
             data.admin = None
         else:
             await self.authorize.require_admin(request=request)
-        return await self.crud_users.update(
+        result = await self.crud_users.update(
             _id=user_id, payload=data, fields=list(fields)
         )
+        self.authorize.invalidate(user_id=user_id)
+        return result
@@ -158,6 +158,13 @@ class ControllerApiV2UsersCredentials:
             le=1000,
             description="pagination limit, min value 10, max value 1000",
         ),
+        after: str = Query(
+            description="pagination cursor, meta.next_cursor of the previous page",
+            default=None,
+        ),
+        with_count: bool = Query(
+            description="include the total result_size in meta", default=True
+        ),
     ):
         if user_id == "_self":
             user = await self.authorize.get_user(request=request)
@@ -171,6 +178,8 @@ class ControllerApiV2UsersCredentials:
             sort_order=sort_order,
             page=page,
             limit=limit,
+            after=after,
+            with_count=with_count,
         )
         return result
 
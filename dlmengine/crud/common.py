@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import typing
 
@@ -8,6 +9,7 @@ import pymongo.errors
 
 from dlmengine.crud.mixins import FilterMixIn
 from dlmengine.crud.mixins import Format
+from dlmengine.crud.mixins import PaginationKeysetMixIn
 from dlmengine.crud.mixins import PaginationSkipMixIn
 from dlmengine.crud.mixins import ProjectionMixIn
 from dlmengine.crud.mixins import SortMixIn
@@ -27,7 +29,13 @@ class Crud:
 
 
 class CrudMongo(
-    Crud, FilterMixIn, Format, PaginationSkipMixIn, ProjectionMixIn, SortMixIn
+    Crud,
+    FilterMixIn,
+    Format,
+    PaginationKeysetMixIn,
+    PaginationSkipMixIn,
+    ProjectionMixIn,
+    SortMixIn,
 ):
     def __init__(self, log: logging.Logger, coll: AsyncIOMotorCollection):
         super().__init__(log)
@@ -49,13 +57,21 @@ class CrudMongo(
     ) -> dict:
         payload["deleting"] = False
         try:
-            _id = await self._coll.insert_one(payload)
-            return await self._get_by_obj_id(_id=_id.inserted_id, fields=fields)
+            await self._coll.insert_one(payload)
         except pymongo.errors.DuplicateKeyError:
             raise DuplicateResource
         except pymongo.errors.ConnectionFailure as err:
             self.log.error(f"backend error: {err}")
             raise BackendError()
+        # the inserted document is what we got, no need to read it back
+        return self._format(self._project(payload, fields))
+
+    async def _count(self, query: dict) -> int:
+        # without a filter the collection metadata has the count already,
+        # only documents being deleted right now might be off
+        if query.keys() == {"deleting"}:
+            return await self._coll.estimated_document_count()
+        return await self._coll.count_documents(filter=query)
 
     async def _delete(self, query: dict) -> dict:
         try:
@@ -67,6 +83,18 @@ class CrudMongo(
             raise ResourceNotFound
         return {}
 
+    async def _delete_and_get(self, query: dict, fields: list) -> dict:
+        try:
+            result = await self._coll.find_one_and_delete(
+                filter=query, projection=self._projection(fields)
+            )
+        except pymongo.errors.ConnectionFailure as err:
+            self.log.error(f"backend error: {err}")
+            raise BackendError()
+        if result is None:
+            raise ResourceNotFound
+        return self._format(result)
+
     async def _delete_mark(self, query: dict) -> None:
         update = {"$set": {"deleting": True}}
         try:
@@ -111,22 +139,68 @@ class CrudMongo(
         sort_order: typing.Optional[str] = None,
         page: typing.Optional[int] = None,
         limit: typing.Optional[int] = None,
+        after: typing.Optional[str] = None,
+        with_count: bool = True,
     ) -> dict:
         query["deleting"] = False
+        if not sort:
+            sort = "_id"
+        if fields and sort not in fields:
+            fields = fields + [sort]
+            strip = sort
+        else:
+            strip = None
+        find_query = query
+        if after:
+            find_query = {
+                "$and": [query, self._pagination_keyset(after, sort, sort_order)]
+            }
+        cursor = self._coll.find(filter=find_query, projection=self._projection(fields))
+        cursor.sort(self._sort(sort=sort, sort_order=sort_order))
+        if page and limit and not after:
+            cursor.skip(self._pagination_skip(page, limit))
+        if limit:
+            cursor.limit(limit)
         try:
-            count = await self._coll.count_documents(
-                filter=query,
-            )
-            cursor = self._coll.find(filter=query, projection=self._projection(fields))
-            if sort and sort_order:
-                cursor.sort(self._sort(sort=sort, sort_order=sort_order))
-            if page and limit:
-                cursor.skip(self._pagination_skip(page, limit))
-                cursor.limit(limit)
-            return self._format_multi(list(await cursor.to_list(limit)), count=count)
+            if with_count:
+                count, result = await asyncio.gather(
+                    self._count(query=query), cursor.to_list(limit)
+                )
+            else:
+                count, result = None, await cursor.to_list(limit)
         except pymongo.errors.ConnectionFailure as err:
             self.log.error(f"backend error: {err}")
             raise BackendError
+        next_cursor = None
+        if limit and len(result) == limit:
+            next_cursor = self._pagination_cursor(result[-1], sort)
+        if strip:
+            for item in result:
+                item.pop(strip, None)
+        return self._format_multi(result, count=count, next_cursor=next_cursor)
+
+    async def _search_stream(
+        self,
+        query: dict,
+        fields: typing.Optional[list] = None,
+        sort: typing.Optional[str] = None,
+        sort_order: typing.Optional[str] = None,
+    ) -> typing.AsyncIterator[dict]:
+        query["deleting"] = False
+        if not sort:
+            sort = "_id"
+        cursor = self._coll.find(
+            filter=query, projection=self._projection(fields), batch_size=1000
+        )
+        cursor.sort(self._sort(sort=sort, sort_order=sort_order))
+        try:
+            async for item in cursor:
+                yield self._format(item)
+        except pymongo.errors.ConnectionFailure as err:
+            self.log.error(f"backend error: {err}")
+            raise BackendError
+        finally:
+            await cursor.close()
 
     async def _update(
         self, query: dict, payload: dict, fields: list, upsert=False
@@ -137,6 +211,13 @@ class CrudMongo(
             if v is None:
                 continue
             update["$set"][k] = v
+        return await self._update_raw(
+            query=query, update=update, fields=fields, upsert=upsert
+        )
+
+    async def _update_raw(
+        self, query: dict, update: dict, fields: list, upsert=False
+    ) -> dict:
         try:
             result = await self._coll.find_one_and_update(
                 filter=query,
@@ -145,6 +226,8 @@ class CrudMongo(
                 return_document=pymongo.ReturnDocument.AFTER,
                 upsert=upsert,
             )
+        except pymongo.errors.DuplicateKeyError:
+            raise DuplicateResource
         except pymongo.errors.ConnectionFailure as err:
             self.log.error(f"backend error: {err}")
             raise BackendError
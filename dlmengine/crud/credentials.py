@@ -1,5 +1,7 @@
 from datetime import datetime
 from datetime import UTC
+import hashlib
+import hmac
 import logging
 import random
 import string
@@ -8,11 +10,14 @@ import uuid
 
 from fastapi import Request
 from motor.motor_asyncio import AsyncIOMotorCollection
-from passlib.hash import pbkdf2_sha512
 import pymongo
 
+from dlmengine.cache import TTLCache
+
 from dlmengine.crud.common import CrudMongo
 
+from dlmengine.hashing import Hasher
+
 from dlmengine.errors import CredentialError
 from dlmengine.errors import ResourceNotFound
 
@@ -26,12 +31,34 @@ from dlmengine.model.v2.credentials import ModelV2CredentialPut
 
 
 class CrudCredentials(CrudMongo):
-    def __init__(self, log: logging.Logger, coll: AsyncIOMotorCollection):
+    def __init__(
+        self,
+        log: logging.Logger,
+        coll: AsyncIOMotorCollection,
+        cache: TTLCache,
+        hasher: Hasher,
+        secret_key: str,
+    ):
         super(CrudCredentials, self).__init__(log=log, coll=coll)
+        self._cache = cache
+        self._hasher = hasher
+        self._secret_key = secret_key.encode()
+
+    @property
+    def cache(self) -> TTLCache:
+        return self._cache
+
+    @property
+    def hasher(self) -> Hasher:
+        return self._hasher
 
-    @staticmethod
-    def _create_secret(token) -> str:
-        return pbkdf2_sha512.encrypt(str(token), rounds=10, salt_size=32)
+    def _cache_key(self, secret_id: str, secret: str) -> tuple:
+        # never keep the presented secret itself, only a keyed digest of it
+        digest = hmac.new(self._secret_key, secret.encode(), hashlib.sha256)
+        return secret_id, digest.hexdigest()
+
+    async def _create_secret(self, token) -> str:
+        return await self.hasher.hash(str(token), rounds=10, salt_size=32)
 
     async def index_create(self) -> None:
         self.log.info(f"creating {self.resource_type} indices")
@@ -45,16 +72,30 @@ class CrudCredentials(CrudMongo):
         x_secret_id = request.headers.get("x-secret-id")
         if not x_secret_id:
             x_secret_id = request.headers.get("x-id")
+        if not x_secret or not x_secret_id:
+            raise CredentialError
+
+        key = self._cache_key(secret_id=x_secret_id, secret=x_secret)
+        owner = self.cache.get(key)
+        if owner is not None:
+            return owner
 
         query = {"id": x_secret_id}
 
         result = await self._get(query=query, fields=["secret", "owner"])
 
-        if not pbkdf2_sha512.verify(x_secret, result["secret"]):
+        if not await self.hasher.verify(x_secret, result["secret"]):
             raise CredentialError
 
+        self.cache.set(key, result["owner"])
         return result["owner"]
 
+    def invalidate(self, _id: typing.Optional[str] = None) -> None:
+        if _id is None:
+            self.cache.clear()
+            return
+        self.cache.invalidate(lambda key: key[0] == _id)
+
     async def create(
         self,
         owner: str,
@@ -68,7 +109,7 @@ class CrudCredentials(CrudMongo):
         )
         created = datetime.now(UTC)
         data["id"] = str(_id)
-        data["secret"] = self._create_secret(str(secret))
+        data["secret"] = await self._create_secret(str(secret))
         data["created"] = created
         data["owner"] = owner
         await self._create(payload=data, fields=["id"])
@@ -83,6 +124,7 @@ class CrudCredentials(CrudMongo):
     async def delete(self, _id: str, owner: str) -> ModelV2DataDelete:
         query = {"id": _id, "owner": owner}
         await self._delete(query=query)
+        self.invalidate(_id=_id)
         return ModelV2DataDelete()
 
     async def delete_all_from_owner(self, owner: str) -> ModelV2DataDelete:
@@ -91,6 +133,7 @@ class CrudCredentials(CrudMongo):
             await self._delete(query=query)
         except ResourceNotFound:
             pass
+        self.invalidate()
         return ModelV2DataDelete()
 
     async def get(self, _id: str, owner: str, fields: list) -> ModelV2CredentialGet:
@@ -109,6 +152,8 @@ class CrudCredentials(CrudMongo):
         sort_order: typing.Optional[sort_order_literal] = None,
         page: typing.Optional[int] = None,
         limit: typing.Optional[int] = None,
+        after: typing.Optional[str] = None,
+        with_count: bool = True,
     ) -> ModelV2CredentialGetMulti:
         query = {"owner": owner}
 
@@ -119,6 +164,8 @@ class CrudCredentials(CrudMongo):
             sort_order=sort_order,
             page=page,
             limit=limit,
+            after=after,
+            with_count=with_count,
         )
         for item in result["result"]:
             if "created" in item:
@@ -132,6 +179,7 @@ class CrudCredentials(CrudMongo):
         query = {"id": _id, "owner": owner}
         data = payload.model_dump()
         result = await self._update(query=query, fields=fields, payload=data)
+        self.invalidate(_id=_id)
         if "created" in result:
             result["created"] = str(result["created"])
         return ModelV2CredentialGet(**result)
@@ -5,28 +5,41 @@ import bonsai.asyncio
 import bonsai.errors
 import bonsai.pool
 
+from dlmengine.cache import TTLCache
+
 from dlmengine.errors import AuthenticationError
 from dlmengine.errors import LdapInvalidDN
 from dlmengine.errors import LdapResourceNotFound
 from dlmengine.errors import LdapNoBackend
 
+_missing = object()
+
 
 class CrudLdap:
     def __init__(
         self,
         log: logging.Logger,
+        cache: TTLCache,
         ldap_base_dn: str,
         ldap_bind_dn: str,
+        ldap_member_batch: int,
         ldap_pool: bonsai.asyncio.AIOConnectionPool,
         ldap_url: str,
         ldap_user_pattern: str,
     ):
+        self._cache = cache
         self._log = log
         self._ldap_base_dn = ldap_base_dn
         self._ldap_bind_dn = ldap_bind_dn
+        self._ldap_member_batch = ldap_member_batch
         self._ldap_pool = ldap_pool
         self._ldap_url = ldap_url
         self._ldap_user_pattern = ldap_user_pattern
+        self._pending: dict[tuple, asyncio.Task] = {}
+
+    @property
+    def cache(self) -> TTLCache:
+        return self._cache
 
     @property
     def log(self):
@@ -40,6 +53,10 @@ class CrudLdap:
     def ldap_bind_dn(self):
         return self._ldap_bind_dn
 
+    @property
+    def ldap_member_batch(self):
+        return self._ldap_member_batch
+
     @property
     def ldap_pool(self):
         if not self._ldap_pool:
@@ -59,12 +76,13 @@ class CrudLdap:
         base_dn: str,
         scope: bonsai.LDAPSearchScope,
         query: str,
+        attrlist: list = None,
     ):
         counter = self.ldap_pool.max_connection + 3
         while counter >= 0:
             conn = await self.ldap_pool.get()
             try:
-                return await conn.search(base_dn, scope, query)
+                return await conn.search(base_dn, scope, query, attrlist=attrlist)
             except bonsai.pool.EmptyPool:
                 self.log.warning("ldap pool empty, waiting 1 second")
                 await asyncio.sleep(1)
@@ -78,6 +96,38 @@ class CrudLdap:
             finally:
                 await self.ldap_pool.put(conn)
 
+    async def _cached(self, key: tuple, loader):
+        result = self.cache.get(key, _missing)
+        if result is not _missing:
+            return result
+
+        async def load():
+            result = await loader()
+            # None marks a missing entry, it is cached like any other result
+            self.cache.set(key, result)
+            return result
+
+        return await self._coalesce(key=key, loader=load)
+
+    async def _coalesce(self, key: tuple, loader):
+        # concurrent lookups of the same key share one directory search
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._track(keys=[key], task=asyncio.create_task(loader()))
+        return await asyncio.shield(pending)
+
+    def _track(self, keys: list, task: asyncio.Task) -> asyncio.Task:
+        for key in keys:
+            self._pending[key] = task
+
+        def done(_):
+            for key in keys:
+                if self._pending.get(key) is task:
+                    del self._pending[key]
+
+        task.add_done_callback(done)
+        return task
+
     async def check_user_credentials(self, user: str, password: str):
         client = bonsai.LDAPClient(self.ldap_url)
         user_name = self.ldap_user_pattern.format(user)
@@ -93,33 +143,127 @@ class CrudLdap:
             raise AuthenticationError
         return user[0]
 
-    async def get_login(self, user: str):
-        user_cn, user_base = user.split(",", maxsplit=1)
-        user = await self._ldap_search(
-            base_dn=user_base, scope=bonsai.LDAPSearchScope.ONELEVEL, query=user_cn
+    @staticmethod
+    def _dn(dn: str) -> bonsai.LDAPDN:
+        try:
+            return bonsai.LDAPDN(dn)
+        except bonsai.errors.InvalidDN:
+            raise LdapInvalidDN
+
+    @staticmethod
+    def _dn_key(dn: bonsai.LDAPDN) -> tuple:
+        # compare parsed rdns, so differences in case, spacing and escaping
+        # of the same dn do not matter
+        return tuple(
+            tuple((attr.lower(), value.lower()) for attr, value in rdn)
+            for rdn in dn.rdns
         )
-        return user[0]["sAMAccountName"]
+
+    async def get_logins(self, users: list) -> list:
+        logins = []
+        bases = {}
+        parents = {}
+        pending = {}
+        for user in users:
+            try:
+                dn = self._dn(user)
+            except LdapInvalidDN:
+                self.log.warning(f"ldap group member is not a valid dn: {user}")
+                continue
+            key = self._dn_key(dn)
+            login = self.cache.get(("login", key), _missing)
+            if login is not _missing:
+                if login is not None:
+                    logins.append(login)
+            elif ("login", key) in self._pending:
+                # already searched for by a concurrent lookup, share its result
+                pending[key] = self._pending[("login", key)]
+            else:
+                bases.setdefault(key[1:], dn[1:])
+                parents.setdefault(key[1:], {})[key] = user
+        for parent, members in parents.items():
+            task = asyncio.create_task(
+                self._get_logins(base=bases[parent], users=members)
+            )
+            self._track(keys=[("login", key) for key in members], task=task)
+            for key in members:
+                pending[key] = task
+        tasks = list(dict.fromkeys(pending.values()))
+        results = await asyncio.gather(*(asyncio.shield(task) for task in tasks))
+        found = {}
+        for result in results:
+            found.update(result)
+        for key in pending:
+            if found.get(key) is not None:
+                logins.append(found[key])
+        return logins
+
+    async def _get_logins(self, base: str, users: dict) -> dict:
+        # members are searched below their own parent, like single lookups, so
+        # members outside of the base dn are found as well
+        query = "".join(
+            f"(distinguishedName={bonsai.escape_filter_exp(user)})"
+            for user in users.values()
+        )
+        result = await self._ldap_search(
+            base_dn=base,
+            scope=bonsai.LDAPSearchScope.ONELEVEL,
+            query=f"(|{query})",
+            attrlist=["sAMAccountName"],
+        )
+        found = {}
+        for entry in result:
+            if "sAMAccountName" in entry:
+                found[self._dn_key(entry.dn)] = entry["sAMAccountName"][0]
+        logins = {}
+        for key, user in users.items():
+            login = found.get(key)
+            if login is None:
+                self.log.warning(f"ldap group member not found: {user}")
+            self.cache.set(("login", key), login)
+            logins[key] = login
+        return logins
 
     async def get_logins_from_group(self, group: str):
-        try:
-            group_cn, group_base = group.split(",", maxsplit=1)
-        except ValueError:
-            raise LdapInvalidDN
-        ldap_group = await self._ldap_search(
-            base_dn=group_base, scope=bonsai.LDAPSearchScope.ONELEVEL, query=group_cn
+        dn = self._dn(group)
+        return await self._coalesce(
+            key=("logins", self._dn_key(dn)),
+            loader=lambda: self._get_logins_from_group(dn=dn),
         )
-        try:
-            ldap_group = ldap_group[0]
-        except IndexError:
+
+    async def _get_logins_from_group(self, dn: bonsai.LDAPDN) -> list:
+        async def load():
+            result = await self._ldap_search(
+                base_dn=dn[1:],
+                scope=bonsai.LDAPSearchScope.ONELEVEL,
+                query=dn[0],
+                attrlist=["member"],
+            )
+            if not result:
+                return None
+            return [str(member) for member in result[0].get("member", [])]
+
+        members = await self._cached(key=("group", self._dn_key(dn)), loader=load)
+        if members is None:
             raise LdapResourceNotFound
-        jobs = []
-        for user in ldap_group["member"]:
-            jobs.append(asyncio.create_task(self.get_login(user=user)))
-        if not jobs:
-            self.log.warning(f"ldap group has no members: {group}")
+        if not members:
+            self.log.warning(f"ldap group has no members: {dn}")
             return []
-        done, _ = await asyncio.wait(jobs, return_when=asyncio.ALL_COMPLETED)
+        # one or-filter search per batch instead of one search per member
+        batch = self.ldap_member_batch
+        results = await asyncio.gather(
+            *(
+                self.get_logins(users=members[i : i + batch])
+                for i in range(0, len(members), batch)
+            )
+        )
         logins = []
-        for job in done:
-            logins.append(job.result()[0])
+        for result in results:
+            logins.extend(result)
         return logins
+
+    def invalidate(self, group: str = None) -> None:
+        if group is None:
+            self.cache.clear()
+            return
+        self.cache.pop(("group", self._dn_key(self._dn(group))))
@@ -1,20 +1,33 @@
+import asyncio
 import datetime
 import logging
 import typing
 
 from bson.objectid import ObjectId
+from bson.timestamp import Timestamp
 from motor.motor_asyncio import AsyncIOMotorCollection
 import pymongo
 import pymongo.errors
 
 from dlmengine.crud.common import CrudMongo
 
+from dlmengine.events import LockEvents
+
+from dlmengine.errors import BackendError
+from dlmengine.errors import DuplicateResource
+from dlmengine.errors import ResourceNotFound
 
 from dlmengine.model.v2.common import ModelV2DataDelete
 from dlmengine.model.v2.common import sort_order_literal
+from dlmengine.model.v2.locks import ModelV2LockBatchDelete
+from dlmengine.model.v2.locks import ModelV2LockBatchPost
+from dlmengine.model.v2.locks import ModelV2LockEvent
 from dlmengine.model.v2.locks import ModelV2LockGet
 from dlmengine.model.v2.locks import ModelV2LockGetMulti
 from dlmengine.model.v2.locks import ModelV2LockPost
+from dlmengine.model.v2.locks import ModelV2LockRenewPut
+from dlmengine.model.v2.locks import ModelV2LockRenewMultiPut
+from dlmengine.model.v2.locks import ModelV2LockTransferPut
 
 
 class CrudLocks(CrudMongo):
@@ -22,49 +35,517 @@ class CrudLocks(CrudMongo):
         self,
         log: logging.Logger,
         coll: AsyncIOMotorCollection,
+        lock_events: LockEvents,
     ):
         super(CrudLocks, self).__init__(log=log, coll=coll)
+        self._lock_events = lock_events
+
+    @property
+    def lock_events(self):
+        return self._lock_events
+
+    def _format(self, item):
+        item = super(CrudLocks, self)._format(item)
+        # fencing tokens are server assigned bson timestamps, which are unique
+        # and increasing, they are handed out as a single 64 bit integer.
+        token = item.get("fencing_token")
+        if isinstance(token, Timestamp):
+            item["fencing_token"] = token.time << 32 | token.inc
+        return item
 
     async def index_create(self) -> None:
         self.log.info(f"creating {self.resource_type} indices")
         await self.coll.create_index([("id", pymongo.ASCENDING)], unique=True)
         await self.coll.create_index([("deleting", pymongo.ASCENDING)])
+        await self.coll.create_index([("expires_at", pymongo.ASCENDING)])
         self.log.info(f"creating {self.resource_type} indices, done")
 
-    async def create(
+    @staticmethod
+    def _lock(
+        _id: str,
+        acquired_by: str,
+        ttl: typing.Optional[int],
+        now: datetime.datetime,
+        mode: str = "exclusive",
+    ) -> dict:
+        expires_at = None
+        if ttl:
+            expires_at = now + datetime.timedelta(seconds=ttl)
+        return {
+            "id": _id,
+            "acquired_by": acquired_by,
+            "acquired_since": now,
+            "expires_at": expires_at,
+            "hold_count": 1,
+            "holders": [acquired_by],
+            "mode": mode,
+            "deleting": False,
+        }
+
+    @staticmethod
+    def _held_by(acquired_by: str) -> dict:
+        # acquired_by of a shared lock only names the first holder, the
+        # current holders are tracked in holders.
+        return {
+            "$or": [
+                {"mode": {"$ne": "shared"}, "acquired_by": acquired_by},
+                {"mode": "shared", "holders": acquired_by},
+            ]
+        }
+
+    @staticmethod
+    def _renewal(expires_at: datetime.datetime) -> list:
+        # exclusive locks take the new expiry, shared locks only ever extend
+        # it and keep no expiry if one of their holders asked for none
+        return [
+            {
+                "$set": {
+                    "expires_at": {
+                        "$switch": {
+                            "branches": [
+                                {
+                                    "case": {"$ne": ["$mode", "shared"]},
+                                    "then": expires_at,
+                                },
+                                {
+                                    "case": {
+                                        "$eq": [
+                                            {"$ifNull": ["$expires_at", None]},
+                                            None,
+                                        ]
+                                    },
+                                    "then": None,
+                                },
+                            ],
+                            "default": {"$max": ["$expires_at", expires_at]},
+                        }
+                    }
+                }
+            }
+        ]
+
+    async def _acquire(
+        self, _id: str, payload: ModelV2LockPost, fields: list
+    ) -> ModelV2LockGet:
+        if payload.mode == "shared":
+            return await self._acquire_shared(_id=_id, payload=payload, fields=fields)
+        if payload.reentrant:
+            return await self._acquire_reentrant(
+                _id=_id, payload=payload, fields=fields
+            )
+        now = datetime.datetime.utcnow()
+        data = self._lock(
+            _id=_id, acquired_by=payload.acquired_by, ttl=payload.ttl, now=now
+        )
+
+        # an expired lock is free, take it over in place, if there is no lock
+        # at all the upsert inserts a new one, if there is a live lock the
+        # upsert collides with the unique id index.
+        query = {"id": _id, "deleting": False, "expires_at": {"$lte": now}}
+        update = {
+            "$set": data,
+            "$currentDate": {"fencing_token": {"$type": "timestamp"}},
+        }
+        result = await self._update_raw(
+            query=query, update=update, fields=fields, upsert=True
+        )
+        self.lock_events.publish(ModelV2LockEvent(event="acquire", **data))
+        return ModelV2LockGet(**result)
+
+    async def _acquire_shared(
         self, _id: str, payload: ModelV2LockPost, fields: list
     ) -> ModelV2LockGet:
-        data = payload.model_dump()
-        data["id"] = _id
-        data["acquired_since"] = datetime.datetime.utcnow()
+        # bson dates have millisecond precision, so the stored expiry compares
+        # equal to the requested one
+        now = datetime.datetime.utcnow()
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        data = self._lock(
+            _id=_id,
+            acquired_by=payload.acquired_by,
+            ttl=payload.ttl,
+            now=now,
+            mode="shared",
+        )
 
-        result = await self._create(fields=fields, payload=data)
+        # join a live shared lock, if there is no lock at all the upsert
+        # inserts a new one, if the lock is held exclusive the upsert collides
+        # with the unique id index. a shared lock expires at the latest expiry
+        # requested by its holders, and never if one of them asked for none.
+        query = {
+            "id": _id,
+            "mode": "shared",
+            "deleting": False,
+            "expires_at": {"$not": {"$lte": now}},
+        }
+        update = {
+            "$addToSet": {"holders": payload.acquired_by},
+            "$setOnInsert": {
+                "acquired_by": data["acquired_by"],
+                "acquired_since": data["acquired_since"],
+            },
+            "$currentDate": {"fencing_token": {"$type": "timestamp"}},
+        }
+        if data["expires_at"]:
+            update["$setOnInsert"]["expires_at"] = data["expires_at"]
+        else:
+            update["$set"] = {"expires_at": None}
+        projection = fields
+        extra = []
+        if fields:
+            extra = [
+                field for field in ("expires_at", "holders") if field not in fields
+            ]
+            projection = fields + extra
+        result = await self._upsert_live(
+            _id=_id, query=query, update=update, fields=projection
+        )
+        expires_at = result["expires_at"]
+        if data["expires_at"] and expires_at and expires_at < data["expires_at"]:
+            await self._extend_shared(_id=_id, expires_at=data["expires_at"])
+            result["expires_at"] = data["expires_at"]
+        if result["holders"] == [payload.acquired_by]:
+            self.lock_events.publish(ModelV2LockEvent(event="acquire", **data))
+        for field in extra:
+            result.pop(field)
         return ModelV2LockGet(**result)
 
-    async def delete(
+    async def _extend_shared(self, _id: str, expires_at: datetime.datetime) -> None:
+        # a range query never matches null, locks without expiry stay so
+        query = {
+            "id": _id,
+            "mode": "shared",
+            "deleting": False,
+            "expires_at": {"$lt": expires_at},
+        }
+        try:
+            await self.coll.update_one(
+                filter=query, update={"$set": {"expires_at": expires_at}}
+            )
+        except pymongo.errors.ConnectionFailure as err:
+            self.log.error(f"backend error: {err}")
+            raise BackendError
+
+    async def _acquire_reentrant(
+        self, _id: str, payload: ModelV2LockPost, fields: list
+    ) -> ModelV2LockGet:
+        now = datetime.datetime.utcnow()
+        data = self._lock(
+            _id=_id, acquired_by=payload.acquired_by, ttl=payload.ttl, now=now
+        )
+
+        # take another hold on a live lock of the same holder, if there is no
+        # lock at all the upsert inserts a new one, if the lock is held by
+        # someone else the upsert collides with the unique id index.
+        query = {
+            "id": _id,
+            "acquired_by": payload.acquired_by,
+            "mode": {"$ne": "shared"},
+            "deleting": False,
+            "expires_at": {"$not": {"$lte": now}},
+        }
+        update = {
+            "$inc": {"hold_count": 1},
+            "$setOnInsert": {
+                "acquired_since": data["acquired_since"],
+                "holders": data["holders"],
+                "mode": data["mode"],
+            },
+            "$currentDate": {"fencing_token": {"$type": "timestamp"}},
+        }
+        if data["expires_at"]:
+            update["$max"] = {"expires_at": data["expires_at"]}
+        else:
+            update["$setOnInsert"]["expires_at"] = None
+        if fields and "hold_count" not in fields:
+            fields = fields + ["hold_count"]
+        result = await self._upsert_live(
+            _id=_id, query=query, update=update, fields=fields
+        )
+        if result["hold_count"] == 1:
+            self.lock_events.publish(ModelV2LockEvent(event="acquire", **data))
+        return ModelV2LockGet(**result)
+
+    async def _upsert_live(
+        self, _id: str, query: dict, update: dict, fields: list
+    ) -> dict:
+        try:
+            return await self._update_raw(
+                query=query, update=update, fields=fields, upsert=True
+            )
+        except DuplicateResource:
+            # an expired lock is free, reap it and try once more
+            if not await self.delete_expired(lock_ids=[_id]):
+                raise
+            return await self._update_raw(
+                query=query, update=update, fields=fields, upsert=True
+            )
+
+    async def create(
+        self, _id: str, payload: ModelV2LockPost, fields: list, wait: int = 0
+    ) -> ModelV2LockGet:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        waiter = None
+        try:
+            while True:
+                # queue up before trying, so a release that happens while the
+                # acquire is in flight is not lost. a waiter that has been
+                # woken up but lost the race goes back to the head of the queue.
+                if wait:
+                    waiter = self.lock_events.enqueue(
+                        lock_id=_id, first=waiter is not None
+                    )
+                try:
+                    return await self._acquire(_id=_id, payload=payload, fields=fields)
+                except DuplicateResource:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        raise
+                if not await self.lock_events.wait(
+                    lock_id=_id, waiter=waiter, timeout=timeout
+                ):
+                    raise DuplicateResource
+        finally:
+            if waiter is not None:
+                self.lock_events.dequeue(lock_id=_id, waiter=waiter)
+
+    async def create_batch(
+        self, payload: ModelV2LockBatchPost, fields: list
+    ) -> ModelV2LockGetMulti:
+        now = datetime.datetime.utcnow()
+        lock_ids = list(dict.fromkeys(payload.locks))
+        await self.delete_expired(lock_ids=lock_ids)
+        data = [
+            self._lock(
+                _id=_id, acquired_by=payload.acquired_by, ttl=payload.ttl, now=now
+            )
+            for _id in lock_ids
+        ]
+        for item in data:
+            # an empty timestamp is replaced by the server on insert
+            item["fencing_token"] = Timestamp(0, 0)
+        try:
+            await self.coll.insert_many(data, ordered=True)
+        except pymongo.errors.BulkWriteError as err:
+            # all or nothing, roll back the locks inserted before the conflict
+            inserted = [item["_id"] for item in data[: err.details["nInserted"]]]
+            if inserted:
+                await self.coll.delete_many(filter={"_id": {"$in": inserted}})
+            if err.details["writeErrors"][0]["code"] == 11000:
+                raise DuplicateResource
+            self.log.error(f"backend error: {err}")
+            raise BackendError
+        except pymongo.errors.ConnectionFailure as err:
+            self.log.error(f"backend error: {err}")
+            raise BackendError
+        for item in data:
+            self.lock_events.publish(ModelV2LockEvent(event="acquire", **item))
+        query = {"_id": {"$in": [item["_id"] for item in data]}}
+        return await self.search(
+            query=query,
+            fields=fields,
+            sort="id",
+            sort_order="ascending",
+            with_count=False,
+        )
+
+    async def delete_reentrant(self, _id: str, acquired_by: str) -> bool:
+        query = {
+            "id": _id,
+            "acquired_by": acquired_by,
+            "mode": {"$ne": "shared"},
+            "deleting": False,
+            "hold_count": {"$gt": 1},
+        }
+        update = {"$inc": {"hold_count": -1}}
+        try:
+            await self._update_raw(query=query, update=update, fields=["id"])
+        except ResourceNotFound:
+            return False
+        return True
+
+    async def delete_shared(self, _id: str, acquired_by: str) -> bool:
+        query = {
+            "id": _id,
+            "mode": "shared",
+            "deleting": False,
+            "holders": acquired_by,
+        }
+        update = {"$pull": {"holders": acquired_by}}
+        try:
+            result = await self._update_raw(
+                query=query, update=update, fields=["holders"]
+            )
+        except ResourceNotFound:
+            return False
+        if result["holders"]:
+            return True
+        # the last holder left, unless a new one joined in the meantime
+        query = {"id": _id, "mode": "shared", "holders": {"$size": 0}}
+        try:
+            await self._delete(query=query)
+        except ResourceNotFound:
+            return True
+        self.lock_events.publish(
+            ModelV2LockEvent(event="release", id=_id, acquired_by=acquired_by)
+        )
+        return True
+
+    async def delete_batch(self, payload: ModelV2LockBatchDelete) -> ModelV2DataDelete:
+        lock_ids = list(dict.fromkeys(payload.locks))
+        if payload.acquired_by is None:
+            await self._delete_many(query={"id": {"$in": lock_ids}}, event="release")
+            return ModelV2DataDelete()
+        # like a single release of the holder, drop its exclusive locks, give
+        # up one hold of its reentrant locks and its share of shared locks.
+        acquired_by = payload.acquired_by
+        exclusive = {
+            "id": {"$in": lock_ids},
+            "acquired_by": acquired_by,
+            "mode": {"$ne": "shared"},
+            "deleting": False,
+        }
+        shared = {"id": {"$in": lock_ids}, "mode": "shared", "deleting": False}
+        await self._delete_many(
+            query={**exclusive, "hold_count": {"$not": {"$gt": 1}}}, event="release"
+        )
+        try:
+            await self.coll.bulk_write(
+                [
+                    pymongo.UpdateMany(
+                        {**exclusive, "hold_count": {"$gt": 1}},
+                        {"$inc": {"hold_count": -1}},
+                    ),
+                    pymongo.UpdateMany(
+                        {**shared, "holders": acquired_by},
+                        {"$pull": {"holders": acquired_by}},
+                    ),
+                ],
+                ordered=True,
+            )
+        except pymongo.errors.ConnectionFailure as err:
+            self.log.error(f"backend error: {err}")
+            raise BackendError
+        await self._delete_many(
+            query={**shared, "holders": {"$size": 0}}, event="release"
+        )
+        return ModelV2DataDelete()
+
+    async def delete_expired(self, lock_ids: typing.Optional[list] = None) -> list:
+        query = {"expires_at": {"$lte": datetime.datetime.utcnow()}}
+        if lock_ids is not None:
+            query["id"] = {"$in": lock_ids}
+        return await self._delete_many(query=query, event="expire")
+
+    async def _delete_many(self, query: dict, event: str) -> list:
+        fields = ["id", "acquired_by", "acquired_since", "expires_at"]
+        try:
+            locks = await self.coll.find(
+                filter=query, projection=self._projection(fields=fields)
+            ).to_list(None)
+            if not locks:
+                return []
+            query["_id"] = {"$in": [lock["_id"] for lock in locks]}
+            result = await self.coll.delete_many(filter=query)
+            if result.deleted_count < len(locks):
+                # some locks changed in between, only report the deleted ones
+                remaining = await self.coll.find(
+                    filter={"_id": query["_id"]}, projection={"_id": 1}
+                ).to_list(None)
+                remaining = {lock["_id"] for lock in remaining}
+                locks = [lock for lock in locks if lock["_id"] not in remaining]
+        except pymongo.errors.ConnectionFailure as err:
+            self.log.error(f"backend error: {err}")
+            raise BackendError
+        for lock in locks:
+            self.lock_events.publish(ModelV2LockEvent(event=event, **lock))
+        return [lock["id"] for lock in locks]
+
+    async def get(
         self,
         _id: str,
-    ) -> ModelV2DataDelete:
+        fields: list,
+    ) -> ModelV2LockGet:
         query = {"id": _id}
-        await self._delete(query=query)
-        return ModelV2DataDelete()
+        result = await self._get(query=query, fields=fields)
+        return ModelV2LockGet(**result)
 
-    async def delete_mark(
+    async def release(
         self,
         _id: str,
-    ) -> None:
+        acquired_by: typing.Optional[str] = None,
+        exclusive: bool = False,
+    ) -> ModelV2DataDelete:
         query = {"id": _id}
-        await self._delete_mark(query=query)
+        if acquired_by is not None:
+            query["acquired_by"] = acquired_by
+        if exclusive:
+            query["mode"] = {"$ne": "shared"}
+        try:
+            result = await self._delete_and_get(
+                query=query,
+                fields=["id", "acquired_by", "acquired_since", "expires_at"],
+            )
+        except ResourceNotFound:
+            if acquired_by is None:
+                raise ResourceNotFound(
+                    details=f"Resource {self.resource_type} {_id} not found"
+                )
+            raise ResourceNotFound(
+                details=f"Resource {self.resource_type} {_id} not held by {acquired_by}"
+            )
+        self.lock_events.publish(ModelV2LockEvent(event="release", **result))
+        return ModelV2DataDelete()
 
-    async def get(
+    async def renew(
         self,
         _id: str,
+        payload: ModelV2LockRenewPut,
         fields: list,
     ) -> ModelV2LockGet:
-        query = {"id": _id}
-        result = await self._get(query=query, fields=fields)
+        now = datetime.datetime.utcnow()
+        query = {
+            "id": _id,
+            "deleting": False,
+            "expires_at": {"$not": {"$lte": now}},
+            **self._held_by(acquired_by=payload.acquired_by),
+        }
+        update = self._renewal(now + datetime.timedelta(seconds=payload.ttl))
+        try:
+            result = await self._update_raw(query=query, update=update, fields=fields)
+        except ResourceNotFound:
+            raise ResourceNotFound(
+                details=f"Resource {self.resource_type} {_id} not held by {payload.acquired_by}"
+            )
         return ModelV2LockGet(**result)
 
+    async def renew_multi(
+        self,
+        payload: ModelV2LockRenewMultiPut,
+        fields: list,
+    ) -> ModelV2LockGetMulti:
+        now = datetime.datetime.utcnow()
+        expires_at = now + datetime.timedelta(seconds=payload.ttl)
+        query = {
+            "id": {"$in": payload.locks},
+            "deleting": False,
+            "expires_at": {"$not": {"$lte": now}},
+            **self._held_by(acquired_by=payload.acquired_by),
+        }
+        try:
+            await self.coll.update_many(filter=query, update=self._renewal(expires_at))
+        except pymongo.errors.ConnectionFailure as err:
+            self.log.error(f"backend error: {err}")
+            raise BackendError
+        # shared locks may keep a later or no expiry, they are renewed as well
+        return await self.search(
+            query=query,
+            fields=fields,
+            sort="id",
+            sort_order="ascending",
+            with_count=False,
+        )
+
     async def resource_exists(
         self,
         _id: str,
@@ -75,16 +556,22 @@ class CrudLocks(CrudMongo):
     async def search(
         self,
         _id: typing.Optional[str] = None,
+        _id_prefix: typing.Optional[str] = None,
+        _id_in: typing.Optional[str] = None,
         fields: typing.Optional[list] = None,
         sort: typing.Optional[str] = None,
         sort_order: typing.Optional[sort_order_literal] = None,
         page: typing.Optional[int] = None,
         limit: typing.Optional[int] = None,
+        after: typing.Optional[str] = None,
+        with_count: bool = True,
         query: typing.Optional[dict] = None,
     ) -> ModelV2LockGetMulti:
         if not query:
             query = {}
-        self._filter_re(query, "id", _id)
+        self._filter_re(query, "id", _id, scalar=True)
+        self._filter_prefix(query, "id", _id_prefix)
+        self._filter_list(query, "id", _id_in)
         result = await self._search(
             query=query,
             fields=fields,
@@ -92,5 +579,84 @@ class CrudLocks(CrudMongo):
             sort_order=sort_order,
             page=page,
             limit=limit,
+            after=after,
+            with_count=with_count,
         )
+        for item in result["result"]:
+            self._format(item)
         return ModelV2LockGetMulti(**result)
+
+    async def search_stream(
+        self,
+        _id: typing.Optional[str] = None,
+        _id_prefix: typing.Optional[str] = None,
+        _id_in: typing.Optional[str] = None,
+        fields: typing.Optional[list] = None,
+        sort: typing.Optional[str] = None,
+        sort_order: typing.Optional[sort_order_literal] = None,
+    ) -> typing.AsyncIterator[ModelV2LockGet]:
+        query = {}
+        self._filter_re(query, "id", _id, scalar=True)
+        self._filter_prefix(query, "id", _id_prefix)
+        self._filter_list(query, "id", _id_in)
+        async for item in self._search_stream(
+            query=query, fields=fields, sort=sort, sort_order=sort_order
+        ):
+            yield ModelV2LockGet(**item)
+
+    async def transfer(
+        self,
+        _id: str,
+        payload: ModelV2LockTransferPut,
+        fields: list,
+    ) -> ModelV2LockGet:
+        now = datetime.datetime.utcnow()
+        data = self._lock(
+            _id=_id, acquired_by=payload.new_holder, ttl=payload.ttl, now=now
+        )
+        query = {
+            "id": _id,
+            "acquired_by": payload.acquired_by,
+            "mode": {"$ne": "shared"},
+            "deleting": False,
+            "expires_at": {"$not": {"$lte": now}},
+        }
+        update = {
+            "$set": {
+                "acquired_by": data["acquired_by"],
+                "acquired_since": data["acquired_since"],
+                "hold_count": data["hold_count"],
+                "holders": data["holders"],
+            },
+            "$currentDate": {"fencing_token": {"$type": "timestamp"}},
+        }
+        if payload.ttl:
+            update["$set"]["expires_at"] = data["expires_at"]
+        try:
+            result = await self._update_raw(query=query, update=update, fields=fields)
+        except ResourceNotFound:
+            raise ResourceNotFound(
+                details=f"Resource {self.resource_type} {_id} not held by {payload.acquired_by}"
+            )
+        self.lock_events.publish(
+            ModelV2LockEvent(
+                event="acquire",
+                id=_id,
+                acquired_by=data["acquired_by"],
+                acquired_since=data["acquired_since"],
+                expires_at=result.get("expires_at"),
+            )
+        )
+        return ModelV2LockGet(**result)
+
+    async def reaper(self, interval: int) -> None:
+        self.log.info(f"starting {self.resource_type} reaper, interval {interval}s")
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                expired = await self.delete_expired()
+            except Exception as err:
+                self.log.error(f"{self.resource_type} reaper failed: {err}")
+                continue
+            if expired:
+                self.log.info(f"reaped {len(expired)} expired {self.resource_type}")
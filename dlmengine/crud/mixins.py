@@ -1,5 +1,13 @@
+import base64
+import binascii
+
+from bson import json_util
 import pymongo
 
+from dlmengine.errors import InvalidCursor
+
+_re_meta = set(".^$*+?{}[]()|\\")
+
 
 class FilterMixIn(object):
     @staticmethod
@@ -19,19 +27,69 @@ class FilterMixIn(object):
         if type(selector) is not list:
             selector = list(set(selector.split(",")))
         if nin:
-            query[field] = {"$nin": selector}
+            query.setdefault(field, {})["$nin"] = selector
         else:
-            query[field] = {"$in": selector}
+            query.setdefault(field, {})["$in"] = selector
+
+    @staticmethod
+    def _filter_prefix(query, field, selector):
+        if not selector:
+            return
+        selector = FilterMixIn._prefix_range(selector)
+        current = query.setdefault(field, {})
+        if "$gte" in current:
+            selector["$gte"] = max(selector["$gte"], current["$gte"])
+        if "$lt" in current:
+            selector["$lt"] = min(selector.get("$lt", current["$lt"]), current["$lt"])
+        current.update(selector)
 
     @staticmethod
-    def _filter_re(query, field, selector, list_filter=None):
-        if selector and list_filter is not None:
+    def _filter_re(query, field, selector, list_filter=None, scalar=False):
+        prefix = None
+        if scalar:
+            prefix = FilterMixIn._regex_prefix(selector)
+        if prefix:
+            # an anchored literal is an index range scan, not a regex scan. on
+            # array fields each bound could be met by a different element.
+            query[field] = FilterMixIn._prefix_range(prefix)
+            if list_filter is not None:
+                query[field]["$in"] = list_filter
+        elif selector and list_filter is not None:
             query[field] = {"$regex": selector, "$in": list_filter}
         elif selector:
             query[field] = {"$regex": selector}
         elif list_filter is not None:
             query[field] = {"$in": list_filter}
 
+    @staticmethod
+    def _prefix_range(prefix):
+        # strings starting with prefix sort between prefix and prefix with its
+        # last character incremented, characters at the top can't be incremented
+        head = prefix.rstrip(chr(0x10FFFF))
+        if not head:
+            return {"$gte": prefix}
+        last = ord(head[-1]) + 1
+        if 0xD800 <= last <= 0xDFFF:
+            last = 0xE000
+        upper = head[:-1] + chr(last)
+        return {"$gte": prefix, "$lt": upper}
+
+    @staticmethod
+    def _regex_prefix(selector):
+        if not selector or not selector.startswith("^"):
+            return None
+        prefix = []
+        chars = iter(selector[1:])
+        for char in chars:
+            if char == "\\":
+                char = next(chars, "")
+                if not char or char.isalnum():
+                    return None
+            elif char in _re_meta:
+                return None
+            prefix.append(char)
+        return "".join(prefix)
+
     @staticmethod
     def _filter_literal(query, field, selector, list_filter=None):
         if selector and list_filter:
@@ -49,8 +107,38 @@ class Format:
         return item
 
     @staticmethod
-    def _format_multi(item, count=None):
-        return {"result": item, "meta": {"result_size": count}}
+    def _format_multi(item, count=None, next_cursor=None):
+        meta = {}
+        if count is not None:
+            meta["result_size"] = count
+        if next_cursor is not None:
+            meta["next_cursor"] = next_cursor
+        return {"result": item, "meta": meta}
+
+
+class PaginationKeysetMixIn:
+    @staticmethod
+    def _pagination_cursor(item, sort):
+        key = [item.get(sort), item["_id"]]
+        return base64.urlsafe_b64encode(json_util.dumps(key).encode()).decode()
+
+    @staticmethod
+    def _pagination_keyset(after, sort, sort_order):
+        try:
+            value, _id = json_util.loads(base64.urlsafe_b64decode(after.encode()))
+        except (binascii.Error, TypeError, ValueError):
+            raise InvalidCursor
+        if sort_order == "descending":
+            op = "$lt"
+        else:
+            op = "$gt"
+        # documents past the last one returned, _id breaks ties of the sort key
+        return {
+            "$or": [
+                {sort: {op: value}},
+                {sort: value, "_id": {op: _id}},
+            ]
+        }
 
 
 class PaginationSkipMixIn:
@@ -69,11 +157,25 @@ class ProjectionMixIn:
             result[field] = 1
         return result
 
+    @staticmethod
+    def _project(item, fields):
+        if not fields:
+            return dict(item)
+        result = {}
+        for field in fields:
+            if field in item:
+                result[field] = item[field]
+        return result
+
 
 class SortMixIn:
     @staticmethod
     def _sort(sort, sort_order):
-        if sort_order == "ascending":
-            return [(sort, pymongo.ASCENDING)]
+        if sort_order == "descending":
+            direction = pymongo.DESCENDING
         else:
-            return [(sort, pymongo.DESCENDING)]
+            direction = pymongo.ASCENDING
+        # _id makes the order total, keyset pagination relies on that
+        if sort == "_id":
+            return [("_id", direction)]
+        return [(sort, direction), ("_id", direction)]
@@ -7,6 +7,8 @@ import pymongo.errors
 
 from dlmengine.crud.common import CrudMongo
 
+from dlmengine.errors import BackendError
+
 from dlmengine.model.v2.common import ModelV2DataDelete
 from dlmengine.model.v2.common import sort_order_literal
 from dlmengine.model.v2.permissions import ModelV2PermissionGet
@@ -89,6 +91,60 @@ class CrudPermissions(CrudMongo):
         query = {"id": _id}
         return await self._resource_exists(query=query)
 
+    async def has_permission(self, user: str, permission: str) -> bool:
+        query = {"users": user, "permissions": permission, "deleting": False}
+        try:
+            result = await self._coll.find_one(filter=query, projection={"_id": 1})
+        except pymongo.errors.ConnectionFailure as err:
+            self.log.error(f"backend error: {err}")
+            raise BackendError
+        return result is not None
+
+    async def ldap_permissions(self) -> list:
+        query = {"ldap_group": {"$nin": ["", None]}, "deleting": False}
+        projection = {"_id": 0, "id": 1, "ldap_group": 1, "users": 1}
+        try:
+            cursor = self._coll.find(filter=query, projection=projection)
+            return await cursor.to_list(None)
+        except pymongo.errors.ConnectionFailure as err:
+            self.log.error(f"backend error: {err}")
+            raise BackendError
+
+    async def ldap_sync_users(self, changes: list) -> None:
+        # $addToSet and $pull on the same field conflict within one update. a
+        # permission moved to another group meanwhile is left alone.
+        requests = []
+        for _id, ldap_group, add, remove in changes:
+            query = {"id": _id, "ldap_group": ldap_group, "deleting": False}
+            if add:
+                requests.append(
+                    pymongo.UpdateOne(
+                        query, {"$addToSet": {"users": {"$each": sorted(add)}}}
+                    )
+                )
+            if remove:
+                requests.append(
+                    pymongo.UpdateOne(
+                        query, {"$pull": {"users": {"$in": sorted(remove)}}}
+                    )
+                )
+        if not requests:
+            return
+        try:
+            await self._coll.bulk_write(requests, ordered=False)
+        except pymongo.errors.ConnectionFailure as err:
+            self.log.error(f"backend error: {err}")
+            raise BackendError
+
+    async def permissions_of_user(self, user: str) -> list:
+        query = {"users": user, "deleting": False}
+        try:
+            result = await self._coll.distinct("permissions", filter=query)
+        except pymongo.errors.ConnectionFailure as err:
+            self.log.error(f"backend error: {err}")
+            raise BackendError
+        return sorted(result)
+
     async def search(
         self,
         _id: typing.Optional[str] = None,
@@ -100,9 +156,11 @@ class CrudPermissions(CrudMongo):
         sort_order: typing.Optional[sort_order_literal] = None,
         page: typing.Optional[int] = None,
         limit: typing.Optional[int] = None,
+        after: typing.Optional[str] = None,
+        with_count: bool = True,
     ) -> ModelV2PermissionGetMulti:
         query = {}
-        self._filter_re(query, "id", _id)
+        self._filter_re(query, "id", _id, scalar=True)
         self._filter_re(query, "ldap_group", ldap_group)
         self._filter_re(query, "permissions", permissions)
         self._filter_re(query, "users", users)
@@ -114,9 +172,31 @@ class CrudPermissions(CrudMongo):
             sort_order=sort_order,
             page=page,
             limit=limit,
+            after=after,
+            with_count=with_count,
         )
         return ModelV2PermissionGetMulti(**result)
 
+    async def search_stream(
+        self,
+        _id: typing.Optional[str] = None,
+        ldap_group: typing.Optional[str] = None,
+        permissions: typing.Optional[str] = None,
+        users: typing.Optional[str] = None,
+        fields: typing.Optional[list] = None,
+        sort: typing.Optional[str] = None,
+        sort_order: typing.Optional[sort_order_literal] = None,
+    ) -> typing.AsyncIterator[ModelV2PermissionGet]:
+        query = {}
+        self._filter_re(query, "id", _id, scalar=True)
+        self._filter_re(query, "ldap_group", ldap_group)
+        self._filter_re(query, "permissions", permissions)
+        self._filter_re(query, "users", users)
+        async for item in self._search_stream(
+            query=query, fields=fields, sort=sort, sort_order=sort_order
+        ):
+            yield ModelV2PermissionGet(**item)
+
     async def update(
         self,
         _id: str,
@@ -0,0 +1,162 @@
+import datetime
+import logging
+import typing
+
+from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+import pymongo
+
+from dlmengine.crud.common import CrudMongo
+
+from dlmengine.errors import DuplicateResource
+from dlmengine.errors import ResourceNotFound
+from dlmengine.errors import SemaphoreExhausted
+
+from dlmengine.model.v2.common import ModelV2DataDelete
+from dlmengine.model.v2.common import sort_order_literal
+from dlmengine.model.v2.semaphores import ModelV2SemaphoreGet
+from dlmengine.model.v2.semaphores import ModelV2SemaphoreGetMulti
+from dlmengine.model.v2.semaphores import ModelV2SemaphoreHolderPost
+from dlmengine.model.v2.semaphores import ModelV2SemaphorePost
+from dlmengine.model.v2.semaphores import ModelV2SemaphorePut
+
+
+class CrudSemaphores(CrudMongo):
+    def __init__(
+        self,
+        log: logging.Logger,
+        coll: AsyncIOMotorCollection,
+    ):
+        super(CrudSemaphores, self).__init__(log=log, coll=coll)
+
+    async def index_create(self) -> None:
+        self.log.info(f"creating {self.resource_type} indices")
+        await self.coll.create_index([("id", pymongo.ASCENDING)], unique=True)
+        self.log.info(f"creating {self.resource_type} indices, done")
+
+    async def acquire(
+        self,
+        _id: str,
+        payload: ModelV2SemaphoreHolderPost,
+        fields: list,
+    ) -> ModelV2SemaphoreGet:
+        # a free slot is taken in a single conditional update, the semaphore
+        # is only matched while it has fewer holders than its capacity.
+        query = {
+            "id": _id,
+            "deleting": False,
+            "holders.acquired_by": {"$ne": payload.acquired_by},
+            "$expr": {"$lt": [{"$size": "$holders"}, "$capacity"]},
+        }
+        update = {
+            "$push": {
+                "holders": {
+                    "acquired_by": payload.acquired_by,
+                    "acquired_since": datetime.datetime.utcnow(),
+                }
+            }
+        }
+        try:
+            result = await self._update_raw(query=query, update=update, fields=fields)
+        except ResourceNotFound:
+            semaphore = await self.get(_id=_id, fields=["holders"])
+            for holder in semaphore.holders:
+                if holder.acquired_by == payload.acquired_by:
+                    raise DuplicateResource
+            raise SemaphoreExhausted
+        return ModelV2SemaphoreGet(**result)
+
+    async def create(
+        self,
+        _id: str,
+        payload: ModelV2SemaphorePost,
+        fields: list,
+    ) -> ModelV2SemaphoreGet:
+        data = payload.model_dump()
+        data["id"] = _id
+        data["holders"] = []
+        result = await self._create(payload=data, fields=fields)
+        return ModelV2SemaphoreGet(**result)
+
+    async def delete(
+        self,
+        _id: str,
+    ) -> ModelV2DataDelete:
+        query = {"id": _id}
+        await self._delete(query=query)
+        return ModelV2DataDelete()
+
+    async def delete_mark(
+        self,
+        _id: str,
+    ) -> None:
+        query = {"id": _id}
+        await self._delete_mark(query=query)
+
+    async def get(
+        self,
+        _id: str,
+        fields: list,
+    ) -> ModelV2SemaphoreGet:
+        query = {"id": _id}
+        result = await self._get(query=query, fields=fields)
+        return ModelV2SemaphoreGet(**result)
+
+    async def release(
+        self,
+        _id: str,
+        acquired_by: str,
+        fields: list,
+    ) -> ModelV2SemaphoreGet:
+        query = {"id": _id, "deleting": False, "holders.acquired_by": acquired_by}
+        update = {"$pull": {"holders": {"acquired_by": acquired_by}}}
+        try:
+            result = await self._update_raw(query=query, update=update, fields=fields)
+        except ResourceNotFound:
+            raise ResourceNotFound(
+                details=f"Resource {self.resource_type} {_id} not held by {acquired_by}"
+            )
+        return ModelV2SemaphoreGet(**result)
+
+    async def resource_exists(
+        self,
+        _id: str,
+    ) -> ObjectId:
+        query = {"id": _id}
+        return await self._resource_exists(query=query)
+
+    async def search(
+        self,
+        _id: typing.Optional[str] = None,
+        fields: typing.Optional[list] = None,
+        sort: typing.Optional[str] = None,
+        sort_order: typing.Optional[sort_order_literal] = None,
+        page: typing.Optional[int] = None,
+        limit: typing.Optional[int] = None,
+        after: typing.Optional[str] = None,
+        with_count: bool = True,
+    ) -> ModelV2SemaphoreGetMulti:
+        query = {}
+        self._filter_re(query, "id", _id, scalar=True)
+        result = await self._search(
+            query=query,
+            fields=fields,
+            sort=sort,
+            sort_order=sort_order,
+            page=page,
+            limit=limit,
+            after=after,
+            with_count=with_count,
+        )
+        return ModelV2SemaphoreGetMulti(**result)
+
+    async def update(
+        self,
+        _id: str,
+        payload: ModelV2SemaphorePut,
+        fields: list,
+    ) -> ModelV2SemaphoreGet:
+        query = {"id": _id}
+        data = payload.model_dump()
+        result = await self._update(query=query, fields=fields, payload=data)
+        return ModelV2SemaphoreGet(**result)
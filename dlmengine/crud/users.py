@@ -3,7 +3,6 @@ import typing
 
 from bson.objectid import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
-from passlib.hash import pbkdf2_sha512
 import pymongo
 import pymongo.errors
 
@@ -13,6 +12,8 @@ from dlmengine.crud.ldap import CrudLdap
 from dlmengine.errors import AuthenticationError
 from dlmengine.errors import BackendError
 
+from dlmengine.hashing import Hasher
+
 from dlmengine.model.v2.common import ModelV2DataDelete
 from dlmengine.model.v2.common import sort_order_literal
 from dlmengine.model.v2.authenticate import ModelV2AuthenticatePost
@@ -28,9 +29,11 @@ class CrudUsers(CrudMongo):
         log: logging.Logger,
         coll: AsyncIOMotorCollection,
         crud_ldap: CrudLdap,
+        hasher: Hasher,
     ):
         super(CrudUsers, self).__init__(log=log, coll=coll)
         self._crud_ldap = crud_ldap
+        self._hasher = hasher
 
     async def index_create(self) -> None:
         self.log.info(f"creating {self.resource_type} indices")
@@ -41,9 +44,12 @@ class CrudUsers(CrudMongo):
     def crud_ldap(self):
         return self._crud_ldap
 
-    @staticmethod
-    def _password(password) -> str:
-        return pbkdf2_sha512.encrypt(password, rounds=100000, salt_size=32)
+    @property
+    def hasher(self) -> Hasher:
+        return self._hasher
+
+    async def _password(self, password) -> str:
+        return await self.hasher.hash(password, rounds=100000, salt_size=32)
 
     async def check_credentials(self, credentials: ModelV2AuthenticatePost) -> str:
         user = credentials.user
@@ -58,7 +64,7 @@ class CrudUsers(CrudMongo):
                     credentials=credentials
                 )
             elif result["backend"] == "internal":
-                if not pbkdf2_sha512.verify(password, result["password"]):
+                if not await self.hasher.verify(password, result["password"]):
                     raise AuthenticationError
             elif result["backend"] == "ldap":
                 try:
@@ -106,7 +112,7 @@ class CrudUsers(CrudMongo):
     ) -> ModelV2UserGet:
         data = payload.model_dump()
         data["id"] = _id
-        data["password"] = self._password(payload.password)
+        data["password"] = await self._password(payload.password)
         data["backend"] = "internal"
         result = await self._create(payload=data, fields=fields)
         return ModelV2UserGet(**result)
@@ -163,9 +169,11 @@ class CrudUsers(CrudMongo):
         sort_order: typing.Optional[sort_order_literal] = None,
         page: typing.Optional[int] = None,
         limit: typing.Optional[int] = None,
+        after: typing.Optional[str] = None,
+        with_count: bool = True,
     ) -> ModelV2UserGetMulti:
         query = {}
-        self._filter_re(query, "id", _id)
+        self._filter_re(query, "id", _id, scalar=True)
 
         result = await self._search(
             query=query,
@@ -174,9 +182,25 @@ class CrudUsers(CrudMongo):
             sort_order=sort_order,
             page=page,
             limit=limit,
+            after=after,
+            with_count=with_count,
         )
         return ModelV2UserGetMulti(**result)
 
+    async def search_stream(
+        self,
+        _id: typing.Optional[str] = None,
+        fields: typing.Optional[list] = None,
+        sort: typing.Optional[str] = None,
+        sort_order: typing.Optional[sort_order_literal] = None,
+    ) -> typing.AsyncIterator[ModelV2UserGet]:
+        query = {}
+        self._filter_re(query, "id", _id, scalar=True)
+        async for item in self._search_stream(
+            query=query, fields=fields, sort=sort, sort_order=sort_order
+        ):
+            yield ModelV2UserGet(**item)
+
     async def update(
         self,
         _id: str,
@@ -188,7 +212,7 @@ class CrudUsers(CrudMongo):
         if data["password"] is not None:
             user_orig = await self.get(_id=_id, fields=["backend"])
             if user_orig.backend == "internal":
-                data["password"] = self._password(data["password"])
+                data["password"] = await self._password(data["password"])
             else:
                 data["passwort"] = None
 
@@ -28,6 +28,13 @@ class BackendError(HTTPException):
         )
 
 
+class InvalidCursor(HTTPException):
+    def __init__(self):
+        super(InvalidCursor, self).__init__(
+            status_code=400, detail="Invalid pagination cursor"
+        )
+
+
 class LdapResourceNotFound(HTTPException):
     def __init__(self):
         super(LdapResourceNotFound, self).__init__(
@@ -75,3 +82,10 @@ class PermError(HTTPException):
             status_code=403,
             detail=f"Permissions error, you are not granted {permission} on this resource",
         )
+
+
+class SemaphoreExhausted(HTTPException):
+    def __init__(self):
+        super(SemaphoreExhausted, self).__init__(
+            status_code=400, detail="Semaphore capacity exhausted"
+        )
@@ -0,0 +1,113 @@
+import asyncio
+import collections
+import logging
+
+from dlmengine.model.v2.locks import ModelV2LockEvent
+
+
+class LockEvents:
+    def __init__(self, log: logging.Logger, queue_size: int):
+        self._log = log
+        self._pre_images = False
+        self._queue_size = queue_size
+        self._streaming = False
+        self._subscribers: dict[asyncio.Queue, str] = {}
+        self._waiters: dict[str, collections.deque] = {}
+
+    @property
+    def log(self):
+        return self._log
+
+    @property
+    def pre_images(self):
+        return self._pre_images
+
+    @pre_images.setter
+    def pre_images(self, value: bool):
+        self._pre_images = value
+
+    @property
+    def queue_size(self):
+        return self._queue_size
+
+    @property
+    def streaming(self):
+        return self._streaming
+
+    @streaming.setter
+    def streaming(self, value: bool):
+        self._streaming = value
+
+    def enqueue(self, lock_id: str, first: bool = False) -> asyncio.Future:
+        waiter = asyncio.get_running_loop().create_future()
+        waiters = self._waiters.setdefault(lock_id, collections.deque())
+        if first:
+            waiters.appendleft(waiter)
+        else:
+            waiters.append(waiter)
+        return waiter
+
+    def dequeue(self, lock_id: str, waiter: asyncio.Future) -> None:
+        waiters = self._waiters.get(lock_id)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            pass
+        if not waiters:
+            del self._waiters[lock_id]
+
+    def publish(self, event: ModelV2LockEvent, local: bool = True) -> None:
+        # while the change stream is up, it delivers the events of this
+        # process as well, publishing them locally would duplicate them.
+        # without pre images deletes carry no lock, releases stay local.
+        if local and self.streaming:
+            if self.pre_images or event.event == "acquire":
+                return
+        if event.event in ("expire", "release"):
+            self.release(lock_id=event.id)
+        for queue, prefix in list(self._subscribers.items()):
+            if not event.id.startswith(prefix):
+                continue
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.log.warning("lock event subscriber too slow, dropping it")
+                self.unsubscribe(queue=queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def release(self, lock_id: str) -> None:
+        waiters = self._waiters.get(lock_id)
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+        if waiters is not None and not waiters:
+            del self._waiters[lock_id]
+
+    def subscribe(self, prefix: str = "") -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[queue] = prefix
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.pop(queue, None)
+
+    def waiting(self) -> list:
+        return list(self._waiters)
+
+    async def wait(self, lock_id: str, waiter: asyncio.Future, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(waiter, timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+            # the release was meant for this waiter, hand it on to the next one
+            if waiter.done() and not waiter.cancelled():
+                self.release(lock_id)
+            raise
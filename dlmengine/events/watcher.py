@@ -0,0 +1,172 @@
+import asyncio
+import datetime
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+import pymongo.errors
+
+from dlmengine.events import LockEvents
+
+from dlmengine.model.v2.locks import ModelV2LockEvent
+
+
+# raised by $changeStream on a standalone server
+_CHANGE_STREAMS_UNSUPPORTED = 40573
+# the resume token is no longer in the oplog, or not valid for this stream
+_RESUME_TOKEN_LOST = (260, 280, 286)
+
+
+class LockWatcher:
+    def __init__(
+        self,
+        log: logging.Logger,
+        coll: AsyncIOMotorCollection,
+        lock_events: LockEvents,
+        poll_interval: int,
+        pre_images: bool,
+        max_backoff: int = 60,
+    ):
+        self._coll = coll
+        self._lock_events = lock_events
+        self._log = log
+        self._max_backoff = max_backoff
+        self._poll_interval = poll_interval
+        self._pre_images = pre_images
+
+    @property
+    def coll(self):
+        return self._coll
+
+    @property
+    def lock_events(self):
+        return self._lock_events
+
+    @property
+    def log(self):
+        return self._log
+
+    @property
+    def max_backoff(self):
+        return self._max_backoff
+
+    @property
+    def poll_interval(self):
+        return self._poll_interval
+
+    @property
+    def pre_images(self):
+        return self._pre_images
+
+    async def run(self) -> None:
+        pre_images = False
+        if self.pre_images:
+            pre_images = await self._enable_pre_images()
+        try:
+            await self._watch(pre_images=pre_images)
+        except pymongo.errors.OperationFailure as err:
+            self.log.warning(
+                f"change streams on {self.coll.name} not supported, "
+                f"polling every {self.poll_interval}s instead: {err}"
+            )
+            await self._poll()
+
+    async def _enable_pre_images(self) -> bool:
+        # delete events only carry the _id of the removed document, the lock
+        # has to be taken from the pre image, which needs mongodb 6.0 or newer
+        # and the dbAdmin role.
+        try:
+            await self.coll.database.command(
+                "collMod",
+                self.coll.name,
+                changeStreamPreAndPostImages={"enabled": True},
+            )
+        except pymongo.errors.OperationFailure as err:
+            self.log.error(
+                f"enabling change stream pre images on {self.coll.name} failed, "
+                f"releases are detected by a lookup instead: {err}"
+            )
+            return False
+        return True
+
+    async def _watch(self, pre_images: bool) -> None:
+        self.log.info(f"watching {self.coll.name} for lock changes")
+        pipeline = [
+            {"$match": {"operationType": {"$in": ["delete", "insert", "update"]}}}
+        ]
+        options = {"full_document": "updateLookup"}
+        if pre_images:
+            options = {
+                "full_document": "whenAvailable",
+                "full_document_before_change": "whenAvailable",
+            }
+        self.lock_events.pre_images = pre_images
+        backoff = self.poll_interval
+        resume_token = None
+        while True:
+            try:
+                async with self.coll.watch(
+                    pipeline=pipeline, resume_after=resume_token, **options
+                ) as stream:
+                    self.lock_events.streaming = True
+                    backoff = self.poll_interval
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        if not self._change(change):
+                            await self._check()
+            except pymongo.errors.OperationFailure as err:
+                if err.code == _CHANGE_STREAMS_UNSUPPORTED:
+                    raise
+                if err.code in _RESUME_TOKEN_LOST:
+                    resume_token = None
+                self.log.error(f"change stream on {self.coll.name} failed: {err}")
+            except pymongo.errors.ConnectionFailure as err:
+                self.log.error(f"lost change stream on {self.coll.name}: {err}")
+            finally:
+                self.lock_events.streaming = False
+            # releases missed while the stream was down are caught by a lookup
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+            await self._check()
+
+    def _change(self, change: dict) -> bool:
+        if change["operationType"] == "delete":
+            lock = change.get("fullDocumentBeforeChange")
+            event = "release"
+            if lock and lock.get("expires_at"):
+                if lock["expires_at"] <= datetime.datetime.utcnow():
+                    event = "expire"
+        elif change["operationType"] == "insert":
+            lock = change.get("fullDocument")
+            event = "acquire"
+        elif "acquired_since" in change["updateDescription"]["updatedFields"]:
+            lock = change.get("fullDocument")
+            event = "acquire"
+        else:
+            return True
+        if not lock:
+            self.log.debug(f"no document image for {change['documentKey']}")
+            return False
+        self.lock_events.publish(ModelV2LockEvent(event=event, **lock), local=False)
+        return True
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self._check()
+
+    async def _check(self) -> None:
+        # wake one waiter of every lock that is waited for but no longer held
+        lock_ids = self.lock_events.waiting()
+        if not lock_ids:
+            return
+        try:
+            held = await self.coll.find(
+                filter={"id": {"$in": lock_ids}}, projection={"id": 1}
+            ).to_list(None)
+        except pymongo.errors.ConnectionFailure as err:
+            self.log.error(f"backend error: {err}")
+            return
+        held = {item["id"] for item in held}
+        for lock_id in lock_ids:
+            if lock_id not in held:
+                self.lock_events.release(lock_id=lock_id)
@@ -0,0 +1,60 @@
+import asyncio
+import concurrent.futures
+import logging
+
+from passlib.hash import pbkdf2_sha512
+
+
+class Hasher:
+    def __init__(self, log: logging.Logger, workers: int):
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="hasher"
+        )
+        self._log = log
+        self._running = 0
+        self._semaphore = asyncio.Semaphore(workers)
+        self._waiting = 0
+        self._workers = workers
+
+    @property
+    def log(self):
+        return self._log
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def hash(self, secret: str, rounds: int, salt_size: int) -> str:
+        return await self._run(
+            pbkdf2_sha512.using(rounds=rounds, salt_size=salt_size).hash, secret
+        )
+
+    async def verify(self, secret: str, secret_hash: str) -> bool:
+        return await self._run(pbkdf2_sha512.verify, secret, secret_hash)
+
+    async def _run(self, func, *args):
+        # pbkdf2 releases the gil, the threads keep it off the event loop, the
+        # semaphore keeps a login storm queued here instead of in the executor.
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._running -= 1
+            self._semaphore.release()
@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 import logging
 import random
@@ -18,6 +19,9 @@ import dlmengine.controller
 import dlmengine.controller.oauth
 
 from dlmengine.authorize import Authorize
+from dlmengine.authorize.watcher import AuthorizeWatcher
+
+from dlmengine.cache import TTLCache
 
 from dlmengine.config import Config
 from dlmengine.config import ConfigLdap as SettingsLdap
@@ -28,12 +32,20 @@ from dlmengine.crud.ldap import CrudLdap
 from dlmengine.crud.locks import CrudLocks
 from dlmengine.crud.oauth import CrudOAuthGitHub
 from dlmengine.crud.permissions import CrudPermissions
+from dlmengine.crud.semaphores import CrudSemaphores
 from dlmengine.crud.users import CrudUsers
 
+from dlmengine.events import LockEvents
+from dlmengine.events.watcher import LockWatcher
+
+from dlmengine.hashing import Hasher
+
 from dlmengine.model.v2.users import ModelV2UserPost
 
 from dlmengine.errors import ResourceNotFound
 
+from dlmengine.sync import LdapSync
+
 
 settings = Config()
 
@@ -66,18 +78,35 @@ async def lifespan(app: FastAPI):
 
     crud_ldap = CrudLdap(
         log=log,
+        cache=TTLCache(ttl=settings.ldap.cachettl, size=settings.ldap.cachesize),
         ldap_base_dn=settings.ldap.basedn,
         ldap_bind_dn=settings.ldap.binddn,
+        ldap_member_batch=settings.ldap.memberbatch,
         ldap_pool=ldap_pool,
         ldap_url=settings.ldap.url,
         ldap_user_pattern=settings.ldap.userpattern,
     )
 
+    lock_events = LockEvents(log=log, queue_size=settings.locks.eventqueue)
+
     crud_locks = CrudLocks(
         log=log,
         coll=mongo_db["locks"],
+        lock_events=lock_events,
     )
     await crud_locks.index_create()
+    locks_reaper = asyncio.create_task(
+        crud_locks.reaper(interval=settings.locks.reaperinterval)
+    )
+    locks_watcher = asyncio.create_task(
+        LockWatcher(
+            log=log,
+            coll=mongo_db["locks"],
+            lock_events=lock_events,
+            poll_interval=settings.locks.pollinterval,
+            pre_images=settings.locks.preimages,
+        ).run()
+    )
 
     crud_permissions = CrudPermissions(
         log=log,
@@ -85,16 +114,28 @@ async def lifespan(app: FastAPI):
     )
     await crud_permissions.index_create()
 
+    crud_semaphores = CrudSemaphores(
+        log=log,
+        coll=mongo_db["semaphores"],
+    )
+    await crud_semaphores.index_create()
+
+    hasher = Hasher(log=log, workers=settings.hashing.workers)
+
     crud_users = CrudUsers(
         log=log,
         coll=mongo_db["users"],
         crud_ldap=crud_ldap,
+        hasher=hasher,
     )
     await crud_users.index_create()
 
     crud_users_credentials = CrudCredentials(
         log=log,
         coll=mongo_db["users_credentials"],
+        cache=TTLCache(ttl=settings.cache.ttl, size=settings.cache.size),
+        hasher=hasher,
+        secret_key=settings.app.secretkey,
     )
     await crud_users_credentials.index_create()
 
@@ -103,7 +144,36 @@ async def lifespan(app: FastAPI):
         crud_permissions=crud_permissions,
         crud_users=crud_users,
         crud_users_credentials=crud_users_credentials,
+        permission_cache=TTLCache(ttl=settings.cache.ttl, size=settings.cache.size),
+        user_cache=TTLCache(ttl=settings.cache.ttl, size=settings.cache.size),
+        secret_key=settings.app.secretkey,
+        token_ttl=settings.app.tokenttl,
     )
+    authorize_watcher = asyncio.create_task(
+        AuthorizeWatcher(
+            log=log,
+            authorize=authorize,
+            colls=[
+                mongo_db["permissions"],
+                mongo_db["users"],
+                mongo_db["users_credentials"],
+            ],
+            retry_interval=settings.locks.pollinterval,
+        ).run()
+    )
+
+    ldap_sync = None
+    ldap_syncer = None
+    if ldap_pool and settings.ldap.syncinterval > 0:
+        ldap_sync = LdapSync(
+            log=log,
+            authorize=authorize,
+            concurrency=settings.ldap.syncconcurrency,
+            crud_ldap=crud_ldap,
+            crud_permissions=crud_permissions,
+            interval=settings.ldap.syncinterval,
+        )
+        ldap_syncer = asyncio.create_task(ldap_sync.run())
 
     controller = dlmengine.controller.Controller(
         log=log,
@@ -111,16 +181,24 @@ async def lifespan(app: FastAPI):
         crud_ldap=crud_ldap,
         crud_locks=crud_locks,
         crud_permissions=crud_permissions,
+        crud_semaphores=crud_semaphores,
         crud_users=crud_users,
         crud_users_credentials=crud_users_credentials,
         crud_oauth=crud_oauth,
         http=http,
+        ldap_sync=ldap_sync,
     )
     app.include_router(controller.router)
 
     log.info("adding routes, done")
     await setup_admin_user(log=log, crud_users=crud_users)
     yield
+    authorize_watcher.cancel()
+    locks_reaper.cancel()
+    locks_watcher.cancel()
+    if ldap_syncer:
+        ldap_syncer.cancel()
+    hasher.close()
 
 
 async def setup_admin_user(log: logging.Logger, crud_users: CrudUsers):
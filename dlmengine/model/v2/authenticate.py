@@ -7,3 +7,9 @@ class ModelV2AuthenticateGetUser(BaseModel):
 
 class ModelV2AuthenticatePost(ModelV2AuthenticateGetUser):
     password: str
+
+
+class ModelV2AuthenticateToken(BaseModel):
+    token: str
+    token_type: str = "bearer"
+    expires_in: int
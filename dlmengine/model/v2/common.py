@@ -1,5 +1,6 @@
 import re
 from typing import Literal
+from typing import Optional
 from typing import Set
 
 from pydantic import BaseModel
@@ -8,6 +9,11 @@ from pydantic import Field
 from typing_extensions import Annotated
 
 
+format_literal = Literal[
+    "json",
+    "ndjson",
+]
+
 sort_order_literal = Literal[
     "ascending",
     "descending",
@@ -15,7 +21,8 @@ sort_order_literal = Literal[
 
 
 class ModelV2MetaMulti(BaseModel):
-    result_size: Annotated[int, Field(gt=-1)]
+    result_size: Optional[Annotated[int, Field(gt=-1)]] = None
+    next_cursor: Optional[str] = None
 
 
 class ModelV2DataDelete(BaseModel):
@@ -4,7 +4,9 @@ from typing import List
 from typing import Literal
 from typing import Optional
 from pydantic import BaseModel
+from pydantic import Field
 from pydantic import StrictStr
+from typing_extensions import Annotated
 
 from dlmengine.model.v2.common import ModelV2MetaMulti
 
@@ -12,17 +14,56 @@ filter_literal = Literal[
     "id",
     "acquired_by",
     "acquired_since",
+    "expires_at",
+    "fencing_token",
+    "hold_count",
+    "holders",
+    "mode",
 ]
 
 filter_list = set(typing_get_args(filter_literal))
 
 sort_literal = Literal["id",]
 
+mode_literal = Literal[
+    "exclusive",
+    "shared",
+]
+
+event_literal = Literal[
+    "acquire",
+    "expire",
+    "release",
+]
+
 
 class ModelV2LockGet(BaseModel):
     id: Optional[StrictStr] = None
     acquired_by: str
     acquired_since: datetime
+    expires_at: Optional[datetime] = None
+    fencing_token: Optional[int] = None
+    hold_count: Optional[int] = None
+    holders: Optional[List[StrictStr]] = None
+    mode: Optional[mode_literal] = None
+
+
+class ModelV2LockBatchDelete(BaseModel):
+    locks: Annotated[List[StrictStr], Field(min_length=1, max_length=1000)]
+    acquired_by: Optional[str] = None
+
+
+class ModelV2LockBatchPost(ModelV2LockBatchDelete):
+    acquired_by: str
+    ttl: Optional[Annotated[int, Field(gt=0)]] = None
+
+
+class ModelV2LockEvent(BaseModel):
+    event: event_literal
+    id: StrictStr
+    acquired_by: Optional[str] = None
+    acquired_since: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
 
 
 class ModelV2LockGetMulti(BaseModel):
@@ -32,3 +73,21 @@ class ModelV2LockGetMulti(BaseModel):
 
 class ModelV2LockPost(BaseModel):
     acquired_by: str
+    mode: mode_literal = "exclusive"
+    reentrant: bool = False
+    ttl: Optional[Annotated[int, Field(gt=0)]] = None
+
+
+class ModelV2LockRenewPut(BaseModel):
+    acquired_by: str
+    ttl: Annotated[int, Field(gt=0)]
+
+
+class ModelV2LockRenewMultiPut(ModelV2LockRenewPut):
+    locks: Annotated[List[StrictStr], Field(min_length=1, max_length=1000)]
+
+
+class ModelV2LockTransferPut(BaseModel):
+    acquired_by: str
+    new_holder: str
+    ttl: Optional[Annotated[int, Field(gt=0)]] = None
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Dict
+from typing import Optional
+from pydantic import BaseModel
+
+
+class ModelV2MetricsCache(BaseModel):
+    entries: int
+    hit_ratio: Optional[float] = None
+    hits: int
+    misses: int
+
+
+class ModelV2MetricsHashing(BaseModel):
+    running: int
+    waiting: int
+    workers: int
+
+
+class ModelV2MetricsLdapSync(BaseModel):
+    errors: int
+    last_duration: Optional[float] = None
+    last_errors: int
+    last_run: Optional[datetime] = None
+    last_updated: int
+    runs: int
+
+
+class ModelV2MetricsGet(BaseModel):
+    caches: Dict[str, ModelV2MetricsCache]
+    hashing: ModelV2MetricsHashing
+    ldap_sync: Optional[ModelV2MetricsLdapSync] = None
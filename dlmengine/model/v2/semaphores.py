@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import get_args as typing_get_args
+from typing import List
+from typing import Literal
+from typing import Optional
+from pydantic import BaseModel
+from pydantic import Field
+from pydantic import StrictStr
+from typing_extensions import Annotated
+
+from dlmengine.model.v2.common import ModelV2MetaMulti
+
+filter_literal = Literal[
+    "id",
+    "capacity",
+    "holders",
+]
+
+filter_list = set(typing_get_args(filter_literal))
+
+sort_literal = Literal["id",]
+
+
+class ModelV2SemaphoreHolder(BaseModel):
+    acquired_by: str
+    acquired_since: datetime
+
+
+class ModelV2SemaphoreGet(BaseModel):
+    id: Optional[StrictStr] = None
+    capacity: Optional[int] = None
+    holders: Optional[List[ModelV2SemaphoreHolder]] = None
+
+
+class ModelV2SemaphoreGetMulti(BaseModel):
+    result: List[ModelV2SemaphoreGet]
+    meta: ModelV2MetaMulti
+
+
+class ModelV2SemaphorePost(BaseModel):
+    capacity: Annotated[int, Field(gt=0)]
+
+
+class ModelV2SemaphorePut(BaseModel):
+    capacity: Optional[Annotated[int, Field(gt=0)]] = None
+
+
+class ModelV2SemaphoreHolderPost(BaseModel):
+    acquired_by: str
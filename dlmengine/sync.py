@@ -0,0 +1,139 @@
+import asyncio
+import datetime
+import logging
+import time
+
+from dlmengine.authorize import Authorize
+
+from dlmengine.crud.ldap import CrudLdap
+from dlmengine.crud.permissions import CrudPermissions
+
+
+class LdapSync:
+    def __init__(
+        self,
+        log: logging.Logger,
+        authorize: Authorize,
+        concurrency: int,
+        crud_ldap: CrudLdap,
+        crud_permissions: CrudPermissions,
+        interval: int,
+    ):
+        self._authorize = authorize
+        self._concurrency = concurrency
+        self._crud_ldap = crud_ldap
+        self._crud_permissions = crud_permissions
+        self._errors = 0
+        self._interval = interval
+        self._last_duration = None
+        self._last_errors = 0
+        self._last_run = None
+        self._last_updated = 0
+        self._log = log
+        self._runs = 0
+
+    @property
+    def authorize(self):
+        return self._authorize
+
+    @property
+    def concurrency(self):
+        return self._concurrency
+
+    @property
+    def crud_ldap(self):
+        return self._crud_ldap
+
+    @property
+    def crud_permissions(self):
+        return self._crud_permissions
+
+    @property
+    def errors(self) -> int:
+        return self._errors
+
+    @property
+    def interval(self):
+        return self._interval
+
+    @property
+    def last_duration(self) -> float | None:
+        return self._last_duration
+
+    @property
+    def last_errors(self) -> int:
+        return self._last_errors
+
+    @property
+    def last_run(self) -> datetime.datetime | None:
+        return self._last_run
+
+    @property
+    def last_updated(self) -> int:
+        return self._last_updated
+
+    @property
+    def log(self):
+        return self._log
+
+    @property
+    def runs(self) -> int:
+        return self._runs
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except Exception as err:
+                self._errors += 1
+                self.log.error(f"ldap sync failed: {err}")
+            await asyncio.sleep(self.interval)
+
+    async def sync(self) -> None:
+        started = time.monotonic()
+        self._last_run = datetime.datetime.now(datetime.UTC)
+        permissions = await self.crud_permissions.ldap_permissions()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        groups = {}
+        errors = 0
+
+        async def resolve(group: str):
+            nonlocal errors
+            async with semaphore:
+                try:
+                    # group members are read fresh each run, the logins of
+                    # members stay cached for ldap.cachettl
+                    self.crud_ldap.invalidate(group=group)
+                    groups[group] = set(
+                        await self.crud_ldap.get_logins_from_group(group=group)
+                    )
+                except Exception as err:
+                    errors += 1
+                    self.log.error(f"ldap sync of group {group} failed: {err}")
+
+        # permissions sharing a group resolve it once per run
+        await asyncio.gather(
+            *(resolve(group) for group in {item["ldap_group"] for item in permissions})
+        )
+        changes = []
+        for item in permissions:
+            users = groups.get(item["ldap_group"])
+            if users is None:
+                continue
+            current = set(item.get("users") or [])
+            add = users - current
+            remove = current - users
+            if add or remove:
+                changes.append((item["id"], item["ldap_group"], add, remove))
+        await self.crud_permissions.ldap_sync_users(changes=changes)
+        if changes:
+            self.authorize.invalidate_permissions()
+        self._errors += errors
+        self._last_duration = time.monotonic() - started
+        self._last_errors = errors
+        self._last_updated = len(changes)
+        self._runs += 1
+        self.log.info(
+            f"ldap sync of {len(permissions)} permissions done in "
+            f"{self._last_duration:.2f}s, {len(changes)} updated, {errors} errors"
+        )